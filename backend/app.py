@@ -1,202 +1,347 @@
 from fastapi import FastAPI, HTTPException, Request, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
-from pydantic import BaseModel, Field
-from engine.adaptive_engine import next_question, score_response
+from fastapi.responses import HTMLResponse, ORJSONResponse, RedirectResponse, Response, StreamingResponse
+from engine import openai_client
+from engine.adaptive_engine import QuestionPrefetcher, next_question, score_response, set_question_cache
+from engine.scoring import set_reply_cache
 from models.session import SessionState
+from storage import NonceStore, ResponseCache, SessionStore, create_redis_client
 from lti_integration import (
+    LaunchClaims,
     LTIConfig, 
     LTIValidator, 
     LTIGradeSubmitter,
-    store_lti_session,
-    get_lti_session
+    create_http_client,
 )
-from typing import Dict, Optional
-import uuid
+from dataclasses import asdict
+from logging.handlers import QueueHandler, QueueListener
+from typing import Annotated, Callable, Dict, Optional, Set
+from urllib.parse import urlencode
+import asyncio
+import base64
+import brotli
+import gzip
+import hashlib
+import jinja2
+import logging
+import msgspec
+import os
+import orjson
+import queue
+import rcssmin
+import rjsmin
 import secrets
+import time
 
-app = FastAPI(title="Adaptive Python Assessment API with LTI")
+app = FastAPI(
+    title="Adaptive Python Assessment API with LTI",
+    default_response_class=ORJSONResponse,
+)
 
 # ============================================================================
 # CORS — Fixed + Development Safe
 # ============================================================================
 
+# "*" already covers file:// ("null") and localhost origins, so listing them
+# next to it only made every preflight scan a longer list. Set CORS_ORIGINS
+# (comma-separated) to lock the API down to the Canvas and frontend domains.
+CORS_ORIGINS = [o.strip() for o in os.environ.get("CORS_ORIGINS", "*").split(",") if o.strip()]
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=[
-        "*",            # Allow all origins in development
-        "null",         # Required when frontend loads via file://
-        "file://",
-        "http://localhost",
-        "http://127.0.0.1",
-    ],
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
+# ============================================================================
+# LOGGING
+# ============================================================================
+
+logger = logging.getLogger("adaptive.app")
+log_listener: Optional[QueueListener] = None
+log_handler: Optional[QueueHandler] = None
+
+
+def configure_logging() -> QueueListener:
+    """Send all log records through a queue drained by a background thread.
+
+    Handlers only enqueue, so a burst of errors never makes request handlers
+    contend for the stderr lock. LOG_LEVEL sets the root level (default INFO);
+    httpx stays at WARNING so every model and Canvas call isn't logged.
+    """
+    global log_handler
+    log_queue = queue.Queue(-1)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    log_handler = QueueHandler(log_queue)
+    root = logging.getLogger()
+    root.addHandler(log_handler)
+    root.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
 # ============================================================================
 # APP STATE
 # ============================================================================
 
-SESSIONS: Dict[str, SessionState] = {}
+redis_client = create_redis_client()
+session_store = SessionStore(redis_client)
+question_prefetcher = QuestionPrefetcher()
+nonce_store = NonceStore(redis_client)  # Prevent OIDC replay
+set_question_cache(ResponseCache(redis_client, namespace="question"))
+set_reply_cache(ResponseCache(redis_client, namespace="reply", ttl=24 * 3600, maxsize=4096))
 
 lti_config = LTIConfig()
 lti_validator = LTIValidator(lti_config)
 lti_grade_submitter = LTIGradeSubmitter(lti_config)
 
-used_nonces = set()  # Prevent OIDC replay
+# Grade passback runs in its own task rather than as a response background
+# task, so it still happens when the client drops the final event stream;
+# shutdown waits for whatever is still in flight
+grade_tasks: Set[asyncio.Task] = set()
+
+
+def queue_grade_submission(**kwargs):
+    task = asyncio.create_task(lti_grade_submitter.submit_grade(**kwargs))
+    grade_tasks.add(task)
+    task.add_done_callback(grade_tasks.discard)
+
+def new_session_id() -> str:
+    """Opaque 22-character session key (128 bits of randomness)"""
+    return secrets.token_urlsafe(16)
+
+
+@app.on_event("startup")
+async def start_logging():
+    global log_listener
+    log_listener = configure_logging()
+
+
+@app.on_event("shutdown")
+async def stop_logging():
+    global log_listener, log_handler
+    # Startup may have failed before the listener was created
+    if log_handler is not None:
+        logging.getLogger().removeHandler(log_handler)
+        log_handler = None
+    if log_listener is not None:
+        log_listener.stop()
+        log_listener = None
+
+
+@app.on_event("startup")
+async def open_http_clients():
+    lti_http_client = create_http_client()
+    lti_validator.client = lti_http_client
+    lti_grade_submitter.client = lti_http_client
+
+
+@app.on_event("startup")
+async def warm_openai_clients():
+    # Resolve DNS and finish the TLS handshake before the first student turn
+    try:
+        await asyncio.wait_for(openai_client.warm_up(), timeout=10)
+    except Exception:
+        logger.warning("OpenAI connection warm-up failed", exc_info=True)
+
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    if grade_tasks:
+        await asyncio.gather(*grade_tasks, return_exceptions=True)
+    await lti_grade_submitter.client.aclose()
+    await openai_client.close()
+
 
 # ============================================================================
 # MODELS
 # ============================================================================
 
-class AnswerRequest(BaseModel):
-    student_answer: str = Field(..., min_length=1, max_length=5000)
-    explanation: str = Field(..., min_length=1, max_length=5000)
-    session_id: str = Field(..., description="Session ID returned by /start")
+# /answer is the hottest request body, so it is decoded and validated by
+# msgspec straight from the raw bytes instead of going through pydantic
+class AnswerRequest(msgspec.Struct):
+    student_answer: Annotated[str, msgspec.Meta(min_length=1, max_length=5000)]
+    explanation: Annotated[str, msgspec.Meta(min_length=1, max_length=5000)]
+    session_id: str  # Session ID returned by /start
+
+
+answer_decoder = msgspec.json.Decoder(AnswerRequest)
 
 
 # ============================================================================
 # LTI ENDPOINTS
 # ============================================================================
 
+# Tool configuration and JWKS never change while the process runs, so the
+# JSON bodies and their ETags are built once instead of on every poll
+LTI_TOOL_CONFIG_JSON = orjson.dumps({
+    "title": "Adaptive Python Assessment",
+    "description": "AI-powered adaptive assessment for Python programming",
+    "oidc_initiation_url": f"{lti_config.tool_url}/lti/login",
+    "target_link_uri": f"{lti_config.tool_url}/lti/launch",
+    "scopes": [
+        "https://purl.imsglobal.org/spec/lti-ags/scope/lineitem",
+        "https://purl.imsglobal.org/spec/lti-ags/scope/score",
+        "https://purl.imsglobal.org/spec/lti-ags/scope/result.readonly",
+    ],
+    "extensions": [
+        {
+            "platform": "canvas.instructure.com",
+            "settings": {
+                "placements": [
+                    {
+                        "placement": "assignment_selection",
+                        "message_type": "LtiResourceLinkRequest",
+                        "target_link_uri": f"{lti_config.tool_url}/lti/launch",
+                        "text": "Adaptive Python Assessment",
+                        "enabled": True,
+                    },
+                    {
+                        "placement": "link_selection",
+                        "message_type": "LtiResourceLinkRequest",
+                        "target_link_uri": f"{lti_config.tool_url}/lti/launch",
+                        "text": "Adaptive Python Assessment",
+                        "enabled": True,
+                    },
+                ]
+            },
+            "privacy_level": "public",
+        }
+    ],
+    "public_jwk_url": f"{lti_config.tool_url}/lti/jwks",
+    "custom_fields": {},
+})
+LTI_JWKS_JSON = orjson.dumps(lti_config.get_public_jwks())
+
+
+def make_etag(body: bytes) -> str:
+    return f'"{hashlib.sha256(body).hexdigest()}"'
+
+
+LTI_TOOL_CONFIG_ETAG = make_etag(LTI_TOOL_CONFIG_JSON)
+LTI_JWKS_ETAG = make_etag(LTI_JWKS_JSON)
+
+
+def cached_json_response(request: Request, body: bytes, etag: str) -> Response:
+    """Serve a precomputed JSON body, answering 304 when the client copy is current"""
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=3600"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
 @app.get("/lti/config.json")
-async def lti_config_json():
-    return {
-        "title": "Adaptive Python Assessment",
-        "description": "AI-powered adaptive assessment for Python programming",
-        "oidc_initiation_url": f"{lti_config.tool_url}/lti/login",
-        "target_link_uri": f"{lti_config.tool_url}/lti/launch",
-        "scopes": [
-            "https://purl.imsglobal.org/spec/lti-ags/scope/lineitem",
-            "https://purl.imsglobal.org/spec/lti-ags/scope/score",
-            "https://purl.imsglobal.org/spec/lti-ags/scope/result.readonly",
-        ],
-        "extensions": [
-            {
-                "platform": "canvas.instructure.com",
-                "settings": {
-                    "placements": [
-                        {
-                            "placement": "assignment_selection",
-                            "message_type": "LtiResourceLinkRequest",
-                            "target_link_uri": f"{lti_config.tool_url}/lti/launch",
-                            "text": "Adaptive Python Assessment",
-                            "enabled": True,
-                        },
-                        {
-                            "placement": "link_selection",
-                            "message_type": "LtiResourceLinkRequest",
-                            "target_link_uri": f"{lti_config.tool_url}/lti/launch",
-                            "text": "Adaptive Python Assessment",
-                            "enabled": True,
-                        },
-                    ]
-                },
-                "privacy_level": "public",
-            }
-        ],
-        "public_jwk_url": f"{lti_config.tool_url}/lti/jwks",
-        "custom_fields": {},
-    }
+async def lti_config_json(request: Request):
+    return cached_json_response(request, LTI_TOOL_CONFIG_JSON, LTI_TOOL_CONFIG_ETAG)
 
 
 @app.get("/lti/jwks")
-async def lti_jwks():
-    return lti_config.get_public_jwks()
+async def lti_jwks(request: Request):
+    return cached_json_response(request, LTI_JWKS_JSON, LTI_JWKS_ETAG)
+
 
+@app.get("/lti/assets/launch.css")
+async def lti_launch_css(request: Request):
+    return precompressed_response(request, LAUNCH_CSS)
 
-@app.get("/lti/login")
-@app.post("/lti/login")
+
+@app.get("/lti/assets/launch.js")
+async def lti_launch_js(request: Request):
+    return precompressed_response(request, LAUNCH_JS)
+
+
+@app.get("/lti/assets/{name}")
+async def lti_hashed_asset(name: str, request: Request):
+    # Fingerprinted names change whenever the content does, so browsers may
+    # keep them forever
+    asset = LAUNCH_ASSETS.get(name)
+    if asset is None:
+        raise HTTPException(404, "Asset not found")
+    return precompressed_response(request, asset, immutable=True)
+
+
+# Only state, nonce and the login hints vary per request, so the rest of
+# the authorization redirect is encoded once
+LTI_AUTH_BASE_URL = lti_config.auth_login_url + "?" + urlencode({
+    "response_type": "id_token",
+    "response_mode": "form_post",
+    "client_id": lti_config.client_id,
+    "redirect_uri": lti_config.launch_url,
+    "scope": "openid",
+    "prompt": "none",
+}) + "&"
+
+
+@app.api_route("/lti/login", methods=["GET", "POST"])
 async def lti_login(request: Request):
-    params = dict(request.query_params)
-    state = secrets.token_urlsafe(32)
-    nonce = secrets.token_urlsafe(32)
-    used_nonces.add(nonce)
-
-    from urllib.parse import urlencode
-
-    auth_params = {
-        "response_type": "id_token",
-        "response_mode": "form_post",
-        "client_id": lti_config.client_id,
-        "redirect_uri": lti_config.launch_url,
-        "scope": "openid",
+    # Platforms may initiate login with a GET (query string) or a form POST
+    if request.method == "POST":
+        params = await request.form()
+    else:
+        params = request.query_params
+
+    # One random draw split into two 192-bit tokens
+    buf = secrets.token_bytes(48)
+    state = base64.urlsafe_b64encode(buf[:24]).rstrip(b"=").decode()
+    nonce = base64.urlsafe_b64encode(buf[24:]).rstrip(b"=").decode()
+    await nonce_store.add(nonce)
+
+    auth_url = LTI_AUTH_BASE_URL + urlencode({
         "state": state,
         "nonce": nonce,
-        "prompt": "none",
         "login_hint": params.get("login_hint", ""),
         "lti_message_hint": params.get("lti_message_hint", ""),
-    }
-
-    auth_url = f"{lti_config.auth_login_url}?{urlencode(auth_params)}"
-    return RedirectResponse(url=auth_url)
+    })
+    return RedirectResponse(url=auth_url, status_code=307)
 
 
 @app.post("/lti/launch")
 async def lti_launch(request: Request, id_token: str = Form(...), state: str = Form(...)):
     try:
-        claims = lti_validator.validate_launch(id_token)
+        claims = await lti_validator.validate_launch(id_token)
         if not claims:
             raise HTTPException(401, "Invalid LTI launch token")
 
-        nonce = claims.get("nonce")
-        if nonce not in used_nonces:
+        if not claims.nonce or not await nonce_store.consume(claims.nonce):
             raise HTTPException(401, "Invalid or reused nonce")
-        used_nonces.discard(nonce)
 
-        user_name = claims.get("name", "Student")
-        user_id = claims.get("sub")
+        is_gradable = claims.ags_endpoint is not None
 
-        is_gradable = "https://purl.imsglobal.org/spec/lti-ags/claim/endpoint" in claims
+        session_id = new_session_id()
+        session = SessionState()
 
-        session_id = str(uuid.uuid4())
-        SESSIONS[session_id] = SessionState()
-
-        if is_gradable:
-            store_lti_session(session_id, claims)
-
-        question = next_question(SESSIONS[session_id])
+        question = await next_question(session, session_id)
         if not question:
             raise HTTPException(500, "Failed to load initial question")
 
-        return HTMLResponse(f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <title>Adaptive Python Assessment</title>
-    <style>{get_embedded_styles()}</style>
-</head>
-<body>
-    <div class="lti-container">
-        <div class="header">
-            <h1>🐍 Adaptive Python Assessment</h1>
-            <p class="user-info">Welcome, {user_name}!</p>
-            {"<p class='gradable-notice'>✓ This assessment will be graded</p>" if is_gradable else ""}
-        </div>
-        <div id="app">
-            <div class="loading">
-                <div class="spinner"></div>
-                <p>Loading...</p>
-            </div>
-        </div>
-    </div>
-
-    <script>
-        const SESSION_ID = "{session_id}";
-        const IS_GRADABLE = {str(is_gradable).lower()};
-        const API = "{lti_config.tool_url}";
-        {get_embedded_javascript()}
-    </script>
-</body>
-</html>
-""")
-
-    except Exception as e:
-        print("Error in LTI launch:", e)
-        raise HTTPException(500, f"Launch error: {e}")
+        await session_store.set(
+            session_id,
+            session,
+            is_lti=is_gradable,
+            lti_claims=asdict(claims) if is_gradable else None,
+        )
+        question_prefetcher.start(session_id, session)
+
+        html = LAUNCH_TEMPLATE.render(
+            session_id=session_id,
+            is_gradable=is_gradable,
+            api=lti_config.tool_url,
+            user_name=claims.name,
+        )
+        return HTMLResponse(html)
+
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("LTI launch failed")
+        raise HTTPException(500, "Launch error")
 
 
 # ============================================================================
@@ -204,30 +349,82 @@ async def lti_launch(request: Request, id_token: str = Form(...), state: str = F
 # ============================================================================
 
 @app.get("/start")
-def start():
+async def start():
     try:
-        session_id = str(uuid.uuid4())
-        SESSIONS[session_id] = SessionState()
+        session_id = new_session_id()
+        session = SessionState()
 
-        question = next_question(SESSIONS[session_id])
+        question = await next_question(session, session_id)
         if not question:
             raise HTTPException(500, "Failed to load question")
 
+        await session_store.set(session_id, session, is_lti=False)
+        question_prefetcher.start(session_id, session)
         return {"session_id": session_id, "question": question}
 
-    except Exception as e:
-        raise HTTPException(500, f"Error starting assessment: {e}")
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("Starting assessment failed")
+        raise HTTPException(500, "Error starting assessment")
 
 
 @app.post("/answer")
-def answer(request: AnswerRequest):
+async def answer(raw_request: Request):
+    try:
+        request = answer_decoder.decode(await raw_request.body())
+    except msgspec.DecodeError as e:
+        raise HTTPException(422, f"Invalid request body: {e}")
+
+    # Clients that accept an event stream get the evaluation and the next
+    # question's text as soon as each is ready, ahead of the full reply
+    if "text/event-stream" in raw_request.headers.get("accept", ""):
+        return StreamingResponse(
+            stream_answer(request),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache"},
+        )
+    return await process_answer(request)
+
+
+def sse_event(event: str, data) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+async def stream_answer(request: AnswerRequest):
+    """Relay process_answer's progress events as they happen, then the full "result"."""
+    events = asyncio.Queue()
+    result_task = asyncio.create_task(process_answer(
+        request, lambda event, data: events.put_nowait(sse_event(event, data))
+    ))
+    # The task is left to finish even if the client disconnects, so the
+    # session is always saved (or closed and its grade queued)
+    result_task.add_done_callback(lambda _: events.put_nowait(None))
+    while (frame := await events.get()) is not None:
+        yield frame
     try:
-        session = SESSIONS.get(request.session_id)
+        yield sse_event("result", result_task.result())
+    except HTTPException as e:
+        yield sse_event("error", {"status_code": e.status_code, "detail": e.detail})
+
+
+async def process_answer(
+    request: AnswerRequest,
+    emit: Optional[Callable[[str, object], None]] = None,
+) -> Dict:
+    """Score an answer and produce the next question or the final summary
+
+    emit, when given, receives ("evaluation", ...) as soon as the answer is
+    scored and ("question", ...) once the next question's text is known, so
+    the client can show feedback while the question is still generating.
+    """
+    try:
+        session = await session_store.get(request.session_id)
         if not session:
             raise HTTPException(404, "Session not found")
 
         # Score the current response
-        evaluation = score_response(session, {
+        evaluation = await score_response(session, {
             "student_answer": request.student_answer,
             "explanation": request.explanation,
         })
@@ -236,19 +433,20 @@ def answer(request: AnswerRequest):
         if session.question_number > session.max_questions:
             session.finished = True
             summary = session.summary()
+            question_prefetcher.cancel(request.session_id)
+
+            # Clean up session, collecting its LTI claims in the same round trip
+            lti_claims = await session_store.close(request.session_id)
 
-            # Submit grade if LTI session
-            lti_claims = get_lti_session(request.session_id)
+            # Submit grade if LTI session, without holding up the response
             if lti_claims:
-                summary["grade_submitted"] = lti_grade_submitter.submit_grade(
-                    id_token_claims=lti_claims,
-                    score=summary["final_score"],
+                queue_grade_submission(
+                    claims=LaunchClaims(**lti_claims),
+                    score=summary.final_score,
                     max_score=1.0,
-                    comment=f"Accuracy: {summary['average_accuracy']:.1%}, Explanation: {summary['average_explanation']:.1%}"
+                    comment=f"Accuracy: {summary.average_accuracy:.1%}, Explanation: {summary.average_explanation:.1%}"
                 )
-
-            # Clean up session
-            del SESSIONS[request.session_id]
+                summary.grade_submitted = "queued"
 
             return {
                 "evaluation": evaluation,
@@ -256,52 +454,66 @@ def answer(request: AnswerRequest):
                 "summary": summary,
             }
 
-        # Not finished - get next question
-        next_q = next_question(session)
-        
+        on_question = None
+        if emit is not None:
+            emit("evaluation", evaluation)
+            on_question = lambda text: emit("question", {"question": text})
+
+        # Not finished - use the question prefetched for this outcome, if any
+        prefetched = await question_prefetcher.take(request.session_id, evaluation)
+        next_q = await next_question(session, request.session_id, prefetched, on_question=on_question)
+        await session_store.set(request.session_id, session)
+        question_prefetcher.start(request.session_id, session)
+
         return {
             "evaluation": evaluation,
             "finished": False,
             "next_question": next_q,
         }
 
-    except Exception as e:
-        print(f"Error processing answer: {e}")
-        raise HTTPException(500, f"Error processing answer: {e}")
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("Processing answer failed")
+        raise HTTPException(500, "Error processing answer")
 
 
 @app.get("/session/{session_id}")
-def get_session_status(session_id: str):
-    session = SESSIONS.get(session_id)
-    if not session:
+async def get_session_status(session_id: str):
+    status = await session_store.get_status(session_id)
+    if not status:
         raise HTTPException(404, "Session not found")
 
-    return {
-        "question_number": session.question_number,
-        "max_questions": session.max_questions,
-        "bloom_level": session.bloom_level,
-        "difficulty": session.difficulty,
-        "finished": session.finished,
-        "is_lti_session": get_lti_session(session_id) is not None,
-    }
+    return status
 
 
 @app.delete("/session/{session_id}")
-def end_session(session_id: str):
-    if session_id in SESSIONS:
-        del SESSIONS[session_id]
+async def end_session(session_id: str):
+    question_prefetcher.cancel(session_id)
+    if await session_store.delete(session_id):
         return {"message": "Session ended"}
 
     raise HTTPException(404, "Session not found")
 
 
+# Load balancers probe this several times a second; serve the same encoded
+# body for HEALTH_TTL seconds instead of asking the store for DBSIZE each time
+HEALTH_TTL = 1.0
+_health_cache = (0.0, b"")
+
+
 @app.get("/health")
-def health():
-    return {
-        "status": "healthy",
-        "active_sessions": len(SESSIONS),
-        "lti_configured": bool(lti_config.client_id),
-    }
+async def health():
+    global _health_cache
+    now = time.monotonic()
+    if now - _health_cache[0] >= HEALTH_TTL:
+        body = orjson.dumps({
+            "status": "healthy",
+            "active_sessions": await session_store.count(),
+            "lti_configured": bool(lti_config.client_id),
+        })
+        _health_cache = (now, body)
+    return Response(_health_cache[1], media_type="application/json")
 
 
 # ============================================================================
@@ -339,24 +551,41 @@ def get_embedded_javascript():
     return """
         let currentSessionId = SESSION_ID;
 
-        function escapeHtml(text) {
-            const div = document.createElement("div");
-            div.textContent = text;
-            return div.innerHTML;
+        function showQuestion(question, pending) {
+            // The streamed text arrives first; keep whatever the student has
+            // typed when the full question follows with the same text
+            const current = document.getElementById("question-text");
+            if (!pending && current && current.textContent === question.question) {
+                document.getElementById("submit").disabled = false;
+                return;
+            }
+            // Clone the parsed template; textContent needs no escaping
+            const view = document.getElementById("question-tpl").content.cloneNode(true);
+            view.getElementById("question-text").textContent = question.question;
+            view.getElementById("submit").disabled = Boolean(pending);
+            document.getElementById("app").replaceChildren(view);
         }
 
-        function showQuestion(question) {
-            const app = document.getElementById("app");
-            app.innerHTML = `
-                <div>
-                    <h2>${escapeHtml(question.question)}</h2>
-                    <textarea id="answer" rows="4" placeholder="Your answer..."></textarea>
-                    <br><br>
-                    <textarea id="explanation" rows="4" placeholder="Explain your reasoning..."></textarea>
-                    <br><br>
-                    <button onclick="submitAnswer()">Submit</button>
-                </div>
-            `;
+        function handleEvent(frame) {
+            let event = "message";
+            let data = "";
+            for (const line of frame.split("\\n")) {
+                if (line.startsWith("event: ")) event = line.slice(7);
+                else if (line.startsWith("data: ")) data += line.slice(6);
+            }
+            const payload = JSON.parse(data);
+
+            if (event === "question") {
+                showQuestion(payload, true);
+            } else if (event === "result") {
+                if (payload.finished) {
+                    showSummary(payload.summary);
+                } else {
+                    showQuestion(payload.next_question);
+                }
+            } else if (event === "error") {
+                document.getElementById("app").textContent = "Error: " + payload.detail;
+            }
         }
 
         async function submitAnswer() {
@@ -379,16 +608,26 @@ def get_embedded_javascript():
 
             const res = await fetch(API + "/answer", {
                 method: "POST",
-                headers: {"Content-Type": "application/json"},
+                headers: {"Content-Type": "application/json", "Accept": "text/event-stream"},
                 body: JSON.stringify(payload),
             });
 
-            const data = await res.json();
+            if (!res.ok) {
+                document.getElementById("app").textContent = "Error submitting answer";
+                return;
+            }
 
-            if (data.finished) {
-                showSummary(data.summary);
-            } else {
-                showQuestion(data.next_question);
+            const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+            let buffer = "";
+            for (;;) {
+                const {value, done} = await reader.read();
+                if (done) break;
+                buffer += value;
+                let end;
+                while ((end = buffer.indexOf("\\n\\n")) >= 0) {
+                    handleEvent(buffer.slice(0, end));
+                    buffer = buffer.slice(end + 2);
+                }
             }
         }
 
@@ -401,4 +640,96 @@ def get_embedded_javascript():
                 <p>Questions Answered: ${summary.responses.length}</p>
             `;
         }
-    """
\ No newline at end of file
+    """
+
+
+def precompress(body: str, media_type: str, name: str) -> Dict:
+    """Encode a static asset once in every supported Content-Encoding
+
+    The asset is also given a content-hashed file name (launch.<hash>.css)
+    that the launch page links to.
+    """
+    raw = body.encode("utf-8")
+    digest = hashlib.sha256(raw).hexdigest()
+    stem, ext = os.path.splitext(name)
+    return {
+        "media_type": media_type,
+        # Strong validators must differ between encodings of the same content
+        "etags": {
+            "identity": f'"{digest}"',
+            "gzip": f'"{digest}-gzip"',
+            "br": f'"{digest}-br"',
+        },
+        "name": f"{stem}.{digest[:12]}{ext}",
+        "identity": raw,
+        "gzip": gzip.compress(raw, compresslevel=9),
+        "br": brotli.compress(raw, quality=11),
+    }
+
+
+def accepted_encodings(header: str) -> Set[str]:
+    """Content codings an Accept-Encoding header allows, i.e. those with a q-value above zero"""
+    accepted = set()
+    for token in header.split(","):
+        name, *params = token.split(";")
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0  # Unparseable weight: don't risk sending that encoding
+        if q > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def precompressed_response(request: Request, asset: Dict, immutable: bool = False) -> Response:
+    """Serve the best precompressed variant the client accepts"""
+    accepted = accepted_encodings(request.headers.get("accept-encoding", ""))
+    encoding = next((e for e in ("br", "gzip") if e in accepted), "identity")
+
+    headers = {
+        "ETag": asset["etags"][encoding],
+        "Cache-Control": "public, max-age=31536000, immutable" if immutable else "public, max-age=3600",
+        "Vary": "Accept-Encoding",
+    }
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    return Response(asset[encoding], media_type=asset["media_type"], headers=headers)
+
+
+# The stylesheet and script are served as separate, cacheable assets that
+# are minified and compressed once here; the launch page itself only carries
+# the per-launch values. Autoescaping covers user_name, which comes from the LMS.
+LAUNCH_CSS = precompress(rcssmin.cssmin(get_embedded_styles()), "text/css", "launch.css")
+LAUNCH_JS = precompress(rjsmin.jsmin(get_embedded_javascript()), "application/javascript", "launch.js")
+LAUNCH_ASSETS = {asset["name"]: asset for asset in (LAUNCH_CSS, LAUNCH_JS)}
+
+templates = jinja2.Environment(
+    loader=jinja2.FileSystemLoader(os.path.join(os.path.dirname(__file__), "templates")),
+    autoescape=True,
+)
+templates.globals["launch_css_url"] = "/lti/assets/" + LAUNCH_CSS["name"]
+templates.globals["launch_js_url"] = "/lti/assets/" + LAUNCH_JS["name"]
+LAUNCH_TEMPLATE = templates.get_template("launch.html")
+
+
+if __name__ == "__main__":
+    import importlib.util
+    import uvicorn
+
+    # uvloop and httptools replace the pure-Python event loop and HTTP parser;
+    # uvloop isn't installed on Windows, which keeps the asyncio loop.
+    # More than one worker needs REDIS_URL so sessions are shared.
+    uvicorn.run(
+        "app:app",
+        host=os.environ.get("HOST", "0.0.0.0"),
+        port=int(os.environ.get("PORT", "8000")),
+        loop="uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        http="httptools",
+        workers=int(os.environ.get("WEB_CONCURRENCY", "1")),
+    )
@@ -1,24 +1,90 @@
 """
 AI-Driven Adaptive Engine
-AI autonomously determines Bloom level, difficulty, and generates all questions
+AI autonomously determines Bloom level, difficulty, and generates all questions.
+Set ENGINE_MODE=rule to draw questions from questions.jsonl with fixed
+score thresholds instead.
 """
 
-import json
+import asyncio
+import copy
+import io
+import logging
 import os
-from typing import Optional, Dict, List
-from engine.scoring import evaluate_answer
-from models.session import SessionState
-from openai import OpenAI
+import random
+import re
+from collections import Counter, OrderedDict, deque
+from typing import Callable, Literal, Optional, Dict, List, Tuple
+from engine.openai_client import client
+from engine.question_bank import Question, load_questions
+from engine.scoring import evaluate_answer, generate_followup_question
+from models.session import BLOOM_ORDER, SessionState
+import orjson
+from pydantic import BaseModel
+from storage import ResponseCache
 
-client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+logger = logging.getLogger("adaptive.engine")
 
+# "ai" generates every question; "rule" selects from the question bank
+ENGINE_MODE = os.getenv("ENGINE_MODE", "ai")
 
-def next_question(session: SessionState) -> Optional[Dict]:
+# Scores at or above this count as "improve" when picking a prefetched question
+PREFETCH_SPLIT = 0.7
+
+# The score each prefetch branch assumes the pending answer gets. A real score
+# further than PREFETCH_TOLERANCE from its branch's discards the candidate.
+PREFETCH_SCORES = {"improve": 1.0, "decline": 0.0}
+PREFETCH_TOLERANCE = 0.25
+
+# Identical prompts within one session (retries, replays) reuse the first reply.
+# In-process by default; the app swaps in a Redis-backed cache when available.
+question_cache = ResponseCache(namespace="question")
+
+# Question selection draws from its own generator rather than the shared
+# module-level one, so it can be seeded on its own (_rng.seed(...))
+_rng = random.Random()
+
+# (difficulty step, Bloom step) per 0.05-wide score bucket, so the rule-based
+# thresholds (>= 0.85 up, < 0.5 easier, < 0.3 also down a level) are one lookup
+LEVEL_STEPS = [(-1, -1)] * 6 + [(-1, 0)] * 4 + [(0, 0)] * 7 + [(1, 1)] * 4
+
+# The bank is only read when the rule-based engine is configured. Question
+# ids are small positive ints, so they are bucketed once as bitmasks (bit n
+# set for id n) and each selection tier is a dict probe plus an AND against
+# the session's asked mask, instead of a scan.
+# Nothing mutates the bank after import, so it is kept in a tuple.
+QUESTIONS: Tuple[Question, ...] = ()
+_BY_ID: Dict[int, Question] = {}
+_ALL_IDS = 0
+_BY_BD: Dict[tuple, int] = {}
+_BY_B: Dict[str, int] = {}
+_BY_D: Dict[int, int] = {}
+if ENGINE_MODE == "rule":
+    QUESTIONS = load_questions()
+    _BY_ID = {_q.id: _q for _q in QUESTIONS}
+    for _q in QUESTIONS:
+        _bit = 1 << _q.id
+        _ALL_IDS |= _bit
+        _BY_BD[_q.bloom, _q.difficulty] = _BY_BD.get((_q.bloom, _q.difficulty), 0) | _bit
+        _BY_B[_q.bloom] = _BY_B.get(_q.bloom, 0) | _bit
+        _BY_D[_q.difficulty] = _BY_D.get(_q.difficulty, 0) | _bit
+
+
+async def next_question(
+    session: SessionState,
+    session_id: str,
+    prefetched: Optional[Dict] = None,
+    mode: str = ENGINE_MODE,
+    on_question: Optional[Callable[[str], None]] = None,
+) -> Optional[Dict]:
     """
     AI generates the next question based on complete session analysis.
     
     Args:
         session: Current session state
+        session_id: Key the session is stored under; scopes the question cache
+        prefetched: Question already generated by QuestionPrefetcher, if any
+        mode: "ai" to generate the question, "rule" to select it from the bank
+        on_question: Called with the question text as soon as it has streamed in
     
     Returns:
         AI-generated question with autonomously determined Bloom level and difficulty
@@ -29,11 +95,14 @@ def next_question(session: SessionState) -> Optional[Dict]:
         return None
     
     try:
-        # Let AI analyze performance and generate next question
-        q = generate_adaptive_question(session)
+        if mode == "rule":
+            q = await rule_based_question(session)
+        else:
+            # Let AI analyze performance and generate next question
+            q = prefetched or await generate_adaptive_question(session, session_id, on_question)
         
         if q is None:
-            print("Error: No question generated")
+            logger.error("No question generated")
             session.finished = True
             return None
         
@@ -42,52 +111,51 @@ def next_question(session: SessionState) -> Optional[Dict]:
         
         session.current_question = q
         
-        # Update session with AI's chosen levels
-        session.bloom_level = q.get("bloom", session.bloom_level)
-        session.difficulty = q.get("difficulty", session.difficulty)
+        # Update session with AI's chosen levels (rule mode sets them in score_response)
+        if mode != "rule":
+            session.bloom_level = q.get("bloom", session.bloom_level)
+            session.difficulty = q.get("difficulty", session.difficulty)
         
         return q
         
-    except Exception as e:
-        print(f"Error generating next question: {e}")
+    except Exception:
+        logger.exception("Generating next question failed")
         session.finished = True
         return None
 
 
-def generate_adaptive_question(session: SessionState) -> Optional[Dict]:
+async def generate_adaptive_question(
+    session: SessionState,
+    session_id: str,
+    on_question: Optional[Callable[[str], None]] = None,
+) -> Optional[Dict]:
     """
     AI autonomously analyzes student performance and generates optimal next question.
     
     Args:
         session: Session state with complete history
+        session_id: Key the session is stored under; scopes the question cache
+        on_question: Called with the question text before the rest of the reply arrives
     
     Returns:
         Generated question with AI-determined parameters
     """
     try:
-        # Build context from session history
-        history_context = build_history_summary(session.history, session)
-        
-        # Get already-asked questions from session memory
-        asked_questions_text = ""
-        if session.asked_questions:
-            asked_questions_text = "\n\nQUESTIONS ALREADY ASKED (NEVER REPEAT THESE):\n" + "\n".join(
-                f"{i+1}. {q}" for i, q in enumerate(session.asked_questions)
-            )
-        
-        # Get covered topics
-        covered_topics_text = ""
-        if session.asked_topics:
-            covered_topics_text = f"\n\nTOPICS ALREADY COVERED: {', '.join(session.asked_topics)}"
-        
-        prompt = f"""You are an adaptive Python assessment AI. Analyze the student's complete learning trajectory and autonomously generate the optimal next question.
+        return await request_question(
+            build_question_prompt(session), session.question_number, session_id, on_question
+        )
+    except Exception as e:
+        logger.warning("AI question generation failed, using fallback: %s", e)
+        return fallback_question(session.question_number, session.bloom_level, session.difficulty)
+
 
-ASSESSMENT PROGRESS: Question {session.question_number} of {session.max_questions}
+# The generation prompt is static apart from the progress line and the
+# history/memory sections, which build_question_prompt joins between these
+_PROMPT_INTRO = """You are an adaptive Python assessment AI. Analyze the student's complete learning trajectory and autonomously generate the optimal next question.
 
-STUDENT PERFORMANCE HISTORY:
-{history_context}
-{asked_questions_text}
-{covered_topics_text}
+ASSESSMENT PROGRESS: Question """
+
+_PROMPT_INSTRUCTIONS = """
 
 CRITICAL REQUIREMENTS:
 1. Generate a COMPLETELY NEW question - do NOT repeat or rephrase any question already asked
@@ -140,7 +208,7 @@ ADAPTATION STRATEGY:
 - Low explanation quality: Focus on understanding, not just answers
 
 Return ONLY valid JSON:
-{{
+{
   "bloom": "Remember|Understand|Apply|Analyze|Evaluate",
   "bloom_number": 1-5,
   "difficulty": 1-5,
@@ -148,65 +216,370 @@ Return ONLY valid JSON:
   "answer": "Expected correct answer or approach",
   "ai_rationale": "Why you chose this level/difficulty/topic for this student",
   "targets": ["misconception or concept being assessed"]
-}}
+}
 """
 
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"},
-            temperature=0.7
+
+async def rule_based_question(session: SessionState) -> Dict:
+    """
+    Rule-based path: a follow-up on the last misconception, else a bank question.
+    
+    Args:
+        session: Session state with levels set by adjust_levels
+    
+    Returns:
+        A fresh question dict (bank entries are copied, never mutated)
+    """
+    if session.last_misconception:
+        misconception, session.last_misconception = session.last_misconception, None
+        bloom_number = session.bloom_idx + 1
+        followup = await generate_followup_question(bloom_number, session.difficulty, misconception)
+        followup["id"] = f"followup_{session.question_number}"
+        followup["bloom"] = session.bloom_level
+        return followup
+    
+    q = select_question(session)
+    if q is None:
+        return fallback_question(session.question_number, session.bloom_level, session.difficulty)
+    
+    session.asked_question_mask |= 1 << q.id
+    return q.to_dict()
+
+
+def _selection_plan(bloom: str, difficulty: int) -> Tuple[int, ...]:
+    """Candidate id masks in order of preference, skipping empty tiers."""
+    tiers = (
+        _BY_BD.get((bloom, difficulty), 0),
+        # Same Bloom level, one step easier or harder
+        _BY_BD.get((bloom, difficulty - 1), 0) | _BY_BD.get((bloom, difficulty + 1), 0),
+        _BY_B.get(bloom, 0),
+        _BY_D.get(difficulty, 0),
+        _ALL_IDS,
+    )
+    return tuple(ids for ids in tiers if ids)
+
+
+# Sessions only ever sit at one of these levels, so every selection walks a
+# prebuilt tuple of tiers
+SELECTION_PLAN: Dict[Tuple[str, int], Tuple[int, ...]] = {
+    (bloom, difficulty): _selection_plan(bloom, difficulty)
+    for bloom in BLOOM_ORDER
+    for difficulty in range(1, 6)
+} if ENGINE_MODE == "rule" else {}
+
+
+def _mask_ids(mask: int) -> List[int]:
+    """The ids whose bits are set in mask, lowest first."""
+    ids = []
+    while mask:
+        low = mask & -mask
+        ids.append(low.bit_length() - 1)
+        mask ^= low
+    return ids
+
+
+def select_question(session: SessionState) -> Optional[Question]:
+    """Pick an unasked bank question, preferring the session's exact level."""
+    bloom, difficulty = session.bloom_level, session.difficulty
+    plan = SELECTION_PLAN.get((bloom, difficulty)) or _selection_plan(bloom, difficulty)
+    for ids in plan:
+        remaining = ids & ~session.asked_question_mask
+        if remaining:
+            return _BY_ID[_rng.choice(_mask_ids(remaining))]
+    
+    logger.warning("Question bank exhausted at Bloom=%s, Difficulty=%s", bloom, difficulty)
+    return None
+
+
+def adjust_levels(session: SessionState, evaluation: Dict):
+    """Apply the rule-based thresholds to the session's Bloom level and difficulty."""
+    final_score = evaluation.get("final_score", 0)
+    difficulty_step, bloom_step = LEVEL_STEPS[max(0, min(20, int(final_score * 20)))]
+    session.bloom_idx = max(0, min(len(BLOOM_ORDER) - 1, session.bloom_idx + bloom_step))
+    session.difficulty = max(1, min(5, session.difficulty + difficulty_step))
+    
+    misconceptions = evaluation.get("misconceptions") or []
+    session.last_misconception = misconceptions[0] if misconceptions else None
+
+
+def build_question_prompt(session: SessionState) -> str:
+    """Build the question-generation prompt from the session's history and memory."""
+    # Build context from session history
+    history_context = build_history_summary(session.history, session)
+    
+    # Get already-asked questions from session memory
+    asked_questions_text = ""
+    if session.asked_questions:
+        asked_questions_text = "\n\nQUESTIONS ALREADY ASKED (NEVER REPEAT THESE):\n" + "\n".join(
+            f"{i+1}. {q}" for i, q in enumerate(session.asked_questions)
         )
+    
+    # Get covered topics
+    covered_topics_text = ""
+    if session.asked_topics:
+        covered_topics_text = f"\n\nTOPICS ALREADY COVERED: {', '.join(session.asked_topics)}"
+    
+    return "".join((
+        _PROMPT_INTRO, str(session.question_number), " of ", str(session.max_questions),
+        "\n\nSTUDENT PERFORMANCE HISTORY:\n", history_context,
+        "\n", asked_questions_text,
+        "\n", covered_topics_text,
+        _PROMPT_INSTRUCTIONS,
+    ))
+
+
+def set_question_cache(cache: ResponseCache):
+    """Replace the cache used for generated questions."""
+    global question_cache
+    question_cache = cache
+
+
+class AIQuestion(BaseModel):
+    """Structured-output schema for a generated question"""
+    bloom: Literal["Remember", "Understand", "Apply", "Analyze", "Evaluate"]
+    bloom_number: int
+    difficulty: int
+    question: str
+    answer: str
+    ai_rationale: str
+    targets: List[str]
+
+
+class QuestionTextScanner:
+    """
+    Picks the "question" value out of a JSON reply while it is still streaming.
+    
+    The reply is accumulated as UTF-8 bytes. Once the key has been seen, each
+    feed only scans the new bytes for the value's closing quote, skipping
+    quotes escaped by an odd run of backslashes.
+    """
+    
+    _KEY = re.compile(rb'(?<!\\)"question"\s*:\s*"')
+    
+    def __init__(self):
+        self.buffer = bytearray()
+        self.text: Optional[str] = None
+        self._start: Optional[int] = None  # Offset of the value's opening quote
+        self._pos = 0
+    
+    def feed(self, piece: str) -> Optional[str]:
+        """Append a streamed piece; return the question text the first time it is complete."""
+        self.buffer += piece.encode("utf-8")
+        if self.text is not None:
+            return None
         
-        result = json.loads(response.choices[0].message.content)
-        
-        # Structure the AI-generated question
-        question = {
-            "id": f"ai_{session.question_number}",
-            "bloom": result.get("bloom", "Understand"),
-            "bloom_number": result.get("bloom_number", 2),
-            "difficulty": result.get("difficulty", 2),
-            "question": result.get("question", ""),
-            "answer": result.get("answer", ""),
-            "ai_rationale": result.get("ai_rationale", ""),
-            "targets": result.get("targets", []),
-            "generated_by": "ai_adaptive_engine"
-        }
+        buf = self.buffer
+        if self._start is None:
+            match = self._KEY.search(buf)
+            if match is None:
+                return None
+            self._start = match.end() - 1
+            self._pos = match.end()
         
-        # Validate
-        if not question["question"] or not question["answer"]:
-            raise ValueError("AI did not generate complete question")
+        while True:
+            end = buf.find(b'"', self._pos)
+            if end < 0:
+                self._pos = len(buf)
+                return None
+            backslashes = 0
+            while buf[end - 1 - backslashes] == 0x5C:  # backslash
+                backslashes += 1
+            self._pos = end + 1
+            if backslashes % 2 == 0:
+                self.text = orjson.loads(buf[self._start:end + 1])
+                return self.text
+
+
+async def request_question(
+    prompt: str,
+    question_number: int,
+    session_id: str,
+    on_question: Optional[Callable[[str], None]] = None,
+) -> Dict:
+    """
+    Send a generation prompt to the model. Raises if the reply is unusable.
+    
+    The reply is streamed so on_question can show the question text while
+    the answer and rationale are still being generated.
+    """
+    # Only a replay or retry within the same session reuses a question. Every
+    # session starts from the same prompt, so an unscoped key would hand all
+    # students the same generated questions
+    cache_key = ResponseCache.key(session_id, prompt)
+    cached = await question_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    # The schema is enforced by the model, so the SDK hands back a validated
+    # AIQuestion instead of a dict to probe field by field
+    scanner = QuestionTextScanner()
+    async with client.beta.chat.completions.stream(
+        model="gpt-4o-mini",
+        messages=[{"role": "user", "content": prompt}],
+        response_format=AIQuestion,
+        temperature=0.7,
+    ) as stream:
+        async for event in stream:
+            if event.type != "content.delta":
+                continue
+            text = scanner.feed(event.delta)
+            if text and on_question is not None:
+                on_question(text)
+        completion = await stream.get_final_completion()
+    
+    result = completion.choices[0].message.parsed
+    if result is None:
+        raise ValueError("AI refused to generate a question")
+    
+    question = {
+        "id": f"ai_{question_number}",
+        **result.model_dump(),
+        "generated_by": "ai_adaptive_engine",
+    }
+    
+    # Validate
+    if not question["question"] or not question["answer"]:
+        raise ValueError("AI did not generate complete question")
+    
+    logger.info("AI generated Q%d: Bloom=%s, Difficulty=%d", question_number, result.bloom, result.difficulty)
+    logger.info("AI Rationale: %.100s...", result.ai_rationale)
+    
+    await question_cache.set(cache_key, question)
+    return question
+
+
+def project_session(session: SessionState, score: float) -> SessionState:
+    """Copy of the session as it would look after scoring `score` on the current question."""
+    projected = copy.copy(session)
+    projected.history = session.history + [{
+        "accuracy": score,
+        "explanation_score": score,
+        "final_score": score,
+        "misconceptions": [],
+        "question": session.current_question,
+    }]
+    projected.asked_questions = session.asked_questions + [session.current_question["question"]]
+    projected.question_number = session.question_number + 1
+    return projected
+
+
+class QuestionPrefetcher:
+    """
+    Generates a session's next question while the student is still answering.
+    
+    Two candidates are requested per session, one as if the pending answer
+    scores well ("improve") and one as if it scores poorly ("decline"); the
+    one matching the real evaluation is used and the other is cancelled.
+    
+    The candidates are generated from an invented evaluation with no
+    misconceptions, so the matching one is only used when the real
+    evaluation is close to it: no misconceptions reported and a score
+    within PREFETCH_TOLERANCE of the branch's. Otherwise both are dropped
+    and the question is generated from the real history, so targeting a
+    misconception is never a question late. The price is a third
+    generation request, and a wait for it, on those answers.
+    
+    Tasks live in this process only, since they cannot travel with the
+    pickled session, so an answer handled by another worker simply
+    generates its question the usual way.
+    """
+    
+    def __init__(self, cap: int = 1024):
+        self._pending: "OrderedDict[str, Dict[str, asyncio.Task]]" = OrderedDict()
+        self._cap = cap
+    
+    def start(self, session_id: str, session: SessionState):
+        """Begin generating candidates for the question after the current one."""
+        self.cancel(session_id)
+        if ENGINE_MODE != "ai":
+            return
+        if session.question_number >= session.max_questions or not session.current_question:
+            return
         
-        print(f"AI generated Q{session.question_number}: Bloom={question['bloom']}, Difficulty={question['difficulty']}")
-        print(f"AI Rationale: {question['ai_rationale'][:100]}...")
+        # Prompts are built now, before the session is mutated by scoring
+        branches = {}
+        for outcome, score in PREFETCH_SCORES.items():
+            task = asyncio.create_task(request_question(
+                build_question_prompt(project_session(session, score)),
+                session.question_number + 1,
+                session_id,
+            ))
+            # The losing branch is never awaited; retrieve its error so
+            # asyncio does not report it as unhandled
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            branches[outcome] = task
+        self._pending[session_id] = branches
+        while len(self._pending) > self._cap:
+            _, branches = self._pending.popitem(last=False)
+            for task in branches.values():
+                task.cancel()
+    
+    async def take(self, session_id: str, evaluation: Dict) -> Optional[Dict]:
+        """Return the candidate matching the evaluation, or None if there is none or it no longer fits."""
+        branches = self._pending.pop(session_id, None)
+        if not branches:
+            return None
         
-        return question
+        score = evaluation.get("final_score", 0)
+        outcome = "improve" if score >= PREFETCH_SPLIT else "decline"
+        if evaluation.get("misconceptions") or abs(score - PREFETCH_SCORES[outcome]) > PREFETCH_TOLERANCE:
+            outcome = None  # The real history calls for a different question
+        for name, task in branches.items():
+            if name != outcome:
+                task.cancel()
+        if outcome is None:
+            return None
         
-    except Exception as e:
-        print(f"Error in AI question generation: {e}")
-        return fallback_question(session.question_number, session.bloom_level, session.difficulty)
+        try:
+            # Already in flight since the question was shown, so awaiting it
+            # is never slower than starting a fresh request
+            return await branches[outcome]
+        except Exception as e:
+            logger.warning("Prefetched question unavailable: %s", e)
+            return None
+    
+    def cancel(self, session_id: str):
+        """Drop any candidates for a session that ended or moved on."""
+        for task in self._pending.pop(session_id, {}).values():
+            task.cancel()
 
 
-def build_history_summary(history: List[Dict], session: SessionState = None) -> str:
-    """Build formatted summary of student's performance history."""
-    if not history:
-        return """No previous questions yet. This is the first question.
+# Every session's first prompt uses this
+EMPTY_HISTORY_SUMMARY = """No previous questions yet. This is the first question.
 
 STARTING APPROACH:
 - Begin with foundational assessment
 - Start at Bloom Level 1-2 (Remember/Understand)
 - Use Difficulty 1-2 to establish baseline
 - Focus on core Python concepts (variables, types, basic operations)"""
+
+
+def build_history_summary(history: List[Dict], session: SessionState = None) -> str:
+    """Build formatted summary of student's performance history."""
+    if not history:
+        return EMPTY_HISTORY_SUMMARY
     
-    summary_parts = []
+    buf = io.StringIO()
+    w = buf.write
     
-    # Overall statistics
+    # Overall statistics, misconceptions and the recent-score window in one pass
     total = len(history)
-    avg_accuracy = sum(e.get('accuracy', 0) for e in history) / total
-    avg_explanation = sum(e.get('explanation_score', 0) for e in history) / total
-    avg_overall = sum(e.get('final_score', 0) for e in history) / total
+    accuracy_sum = explanation_sum = overall_sum = 0.0
+    misconceptions = Counter()
+    recent_scores = deque(maxlen=3)
+    for e in history:
+        accuracy_sum += e.get('accuracy', 0)
+        explanation_sum += e.get('explanation_score', 0)
+        final_score = e.get('final_score', 0)
+        overall_sum += final_score
+        recent_scores.append(final_score)
+        misconceptions.update(e.get('misconceptions', ()))
+    
+    avg_accuracy = accuracy_sum / total
+    avg_explanation = explanation_sum / total
+    avg_overall = overall_sum / total
     
-    summary_parts.append(f"""OVERALL PERFORMANCE ({total} questions completed):
+    w(f"""OVERALL PERFORMANCE ({total} questions completed):
 - Average Accuracy: {avg_accuracy*100:.1f}%
 - Average Explanation Quality: {avg_explanation*100:.1f}%
 - Average Overall Score: {avg_overall*100:.1f}%
@@ -214,13 +587,12 @@ STARTING APPROACH:
     
     # Recent performance (last 3 questions)
     recent = history[-3:]
-    summary_parts.append("\nRECENT QUESTIONS:")
+    w("\n\nRECENT QUESTIONS:")
     
     for i, evaluation in enumerate(recent, start=len(history)-len(recent)+1):
         question = evaluation.get('question', {})
         
-        summary_parts.append(f"""
-Question {i}:
+        w(f"""\n\nQuestion {i}:
   - Bloom: {question.get('bloom', 'N/A')} (Level {question.get('bloom_number', 'N/A')})
   - Difficulty: {question.get('difficulty', 'N/A')}/5
   - Accuracy: {evaluation.get('accuracy', 0)*100:.0f}%
@@ -229,65 +601,62 @@ Question {i}:
   - Misconceptions: {', '.join(evaluation.get('misconceptions', [])) or 'None detected'}""")
     
     # Identify patterns
-    summary_parts.append("\nPERFORMANCE PATTERNS:")
+    w("\n\nPERFORMANCE PATTERNS:")
     
     # Accuracy trend
     if len(history) >= 3:
-        recent_scores = [e.get('final_score', 0) for e in history[-3:]]
         if all(recent_scores[i] >= recent_scores[i-1] for i in range(1, len(recent_scores))):
-            summary_parts.append("- ✓ Improving trend - scores increasing")
+            w("\n- ✓ Improving trend - scores increasing")
         elif all(recent_scores[i] <= recent_scores[i-1] for i in range(1, len(recent_scores))):
-            summary_parts.append("- ⚠ Declining trend - scores decreasing")
+            w("\n- ⚠ Declining trend - scores decreasing")
         else:
-            summary_parts.append("- • Mixed performance - inconsistent results")
+            w("\n- • Mixed performance - inconsistent results")
     
-    # Misconceptions tracking
-    all_misconceptions = []
-    for e in history:
-        all_misconceptions.extend(e.get('misconceptions', []))
-    
-    if all_misconceptions:
-        unique_misconceptions = list(set(all_misconceptions))
-        summary_parts.append(f"- ⚠ Recurring issues: {', '.join(unique_misconceptions[:3])}")
+    # Misconceptions tracking, most frequent first (ties in first-seen order)
+    if misconceptions:
+        w(f"\n- ⚠ Recurring issues: {', '.join(m for m, _ in misconceptions.most_common(3))}")
     else:
-        summary_parts.append("- ✓ No major misconceptions detected")
+        w("\n- ✓ No major misconceptions detected")
     
     # Explanation quality
     if avg_explanation < 0.5:
-        summary_parts.append("- ⚠ Low explanation quality - may not fully understand concepts")
+        w("\n- ⚠ Low explanation quality - may not fully understand concepts")
     elif avg_explanation > 0.8:
-        summary_parts.append("- ✓ Strong explanations - demonstrates deep understanding")
+        w("\n- ✓ Strong explanations - demonstrates deep understanding")
     
-    return '\n'.join(summary_parts)
+    return buf.getvalue()
+
+
+# Built once; looked up by Bloom level whenever generation fails
+FALLBACK_QUESTIONS = {
+    "Remember": "What is a variable in Python?",
+    "Understand": "Explain the difference between a list and a tuple.",
+    "Apply": "Write a function that returns the sum of numbers in a list.",
+    "Analyze": "What's wrong with this code: def add(x, y): return x + y + z",
+    "Evaluate": "When should you use a dictionary instead of a list?"
+}
 
 
 def fallback_question(question_num: int, bloom: str, difficulty: int) -> Dict:
     """Fallback question if AI generation fails."""
-    fallback_questions = {
-        "Remember": "What is a variable in Python?",
-        "Understand": "Explain the difference between a list and a tuple.",
-        "Apply": "Write a function that returns the sum of numbers in a list.",
-        "Analyze": "What's wrong with this code: def add(x, y): return x + y + z",
-        "Evaluate": "When should you use a dictionary instead of a list?"
-    }
-    
     return {
         "id": f"fallback_{question_num}",
         "bloom": bloom,
         "difficulty": difficulty,
-        "question": fallback_questions.get(bloom, "What is Python?"),
+        "question": FALLBACK_QUESTIONS.get(bloom, "What is Python?"),
         "answer": "Expected answer varies based on question",
         "generated_by": "fallback_system"
     }
 
 
-def score_response(session: SessionState, resp: Dict) -> Dict:
+async def score_response(session: SessionState, resp: Dict, mode: str = ENGINE_MODE) -> Dict:
     """
-    Score student response. Session levels are now set by AI, not rules.
+    Score student response. Session levels are set by AI unless mode is "rule".
     
     Args:
         session: Current session state
         resp: Dictionary with 'student_answer' and 'explanation' keys
+        mode: "rule" applies the fixed score thresholds to the session levels
     
     Returns:
         Evaluation dictionary with scores and misconceptions
@@ -298,7 +667,7 @@ def score_response(session: SessionState, resp: Dict) -> Dict:
             raise ValueError("Response missing required fields")
         
         # Evaluate the answer using AI
-        evaluation = evaluate_answer(session.current_question, resp)
+        evaluation = await evaluate_answer(session.current_question, resp)
         
         # Store question info with evaluation for AI's future analysis
         evaluation['question'] = session.current_question
@@ -309,17 +678,22 @@ def score_response(session: SessionState, resp: Dict) -> Dict:
         # Advance question counter
         session.question_number += 1
         
-        # Note: We NO LONGER manually adjust difficulty/Bloom here
-        # The AI will analyze complete history and make those decisions autonomously
+        # In AI mode difficulty/Bloom are NOT adjusted here; the AI analyzes
+        # the complete history and makes those decisions autonomously
+        if mode == "rule":
+            adjust_levels(session, evaluation)
         
-        print(f"Scored response: Accuracy={evaluation.get('accuracy', 0)*100:.0f}%, "
-              f"Explanation={evaluation.get('explanation_score', 0)*100:.0f}%, "
-              f"Overall={evaluation.get('final_score', 0)*100:.0f}%")
+        logger.info(
+            "Scored response: Accuracy=%.0f%%, Explanation=%.0f%%, Overall=%.0f%%",
+            evaluation.get("accuracy", 0) * 100,
+            evaluation.get("explanation_score", 0) * 100,
+            evaluation.get("final_score", 0) * 100,
+        )
         
         return evaluation
         
     except Exception as e:
-        print(f"Error scoring response: {e}")
+        logger.exception("Scoring response failed")
         
         # Still advance question counter on error
         session.question_number += 1
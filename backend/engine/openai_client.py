@@ -0,0 +1,32 @@
+"""
+Shared OpenAI client
+One async client for scoring and question generation over a pooled HTTP/2
+connection, so repeated calls skip the DNS lookup and TLS handshake
+"""
+
+import os
+
+import httpx
+from openai import AsyncOpenAI
+
+from http_pool import pool_limits
+
+# For deployment: Set OPENAI_API_KEY in your hosting platform's environment variables
+# Render: Dashboard → Environment → Add OPENAI_API_KEY
+# Railway: Variables tab → Add OPENAI_API_KEY
+# Fly.io: fly secrets set OPENAI_API_KEY=sk-...
+OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
+
+client = AsyncOpenAI(
+    api_key=OPENAI_API_KEY,
+    http_client=httpx.AsyncClient(http2=True, limits=pool_limits(20)),
+)
+
+
+async def warm_up():
+    """Open a pooled connection with a cheap authenticated request"""
+    await client.models.list()
+
+
+async def close():
+    await client.close()
@@ -0,0 +1,72 @@
+"""
+Question bank loader
+Parses questions.jsonl into immutable Question records and caches them as a
+pickle next to the bank. Later process starts read the pickle through mmap,
+so every worker unpickles from the one copy in the OS page cache
+"""
+
+import mmap
+import os
+import pickle
+from typing import Dict, NamedTuple, Tuple
+
+import orjson
+
+QUESTIONS_PATH = os.path.join(os.path.dirname(__file__), "questions.jsonl")
+
+# Bumped whenever the pickled layout changes, so older caches are rebuilt
+CACHE_FORMAT = 3
+
+
+class Question(NamedTuple):
+    """A question bank entry, shared by every session and never modified"""
+    id: int
+    bloom: str
+    difficulty: int
+    question: str
+    answer: str
+    misconceptions: Tuple[str, ...]
+
+    def to_dict(self) -> Dict:
+        """A fresh dict for the browser, with misconceptions as a list"""
+        return {**self._asdict(), "misconceptions": list(self.misconceptions)}
+
+
+def parse_question(line: bytes) -> Question:
+    """One bank line as a Question"""
+    fields = orjson.loads(line)
+    fields["misconceptions"] = tuple(fields.get("misconceptions", ()))
+    return Question(**fields)
+
+
+def load_questions(path: str = QUESTIONS_PATH) -> Tuple[Question, ...]:
+    """Load every question in a JSONL bank, reusing the pickle cache when fresh
+
+    The cache is keyed by the bank's mtime and CACHE_FORMAT.
+    """
+    cache_path = os.path.splitext(path)[0] + ".pkl"
+    cache_key = (CACHE_FORMAT, os.stat(path).st_mtime_ns)
+
+    try:
+        with open(cache_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            cached_key, questions = pickle.loads(m)
+        if cached_key == cache_key:
+            return questions
+    except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+        pass
+
+    # orjson accepts the trailing newline, so lines go to it as read; only
+    # blank lines are skipped, and the file is never held in memory whole
+    with open(path, "rb") as f:
+        questions = tuple(parse_question(line) for line in f if not line.isspace())
+
+    # Write then rename so workers starting together never read half a file
+    try:
+        tmp_path = f"{cache_path}.{os.getpid()}"
+        with open(tmp_path, "wb") as f:
+            pickle.dump((cache_key, questions), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass  # Read-only deploy; parse again on the next start
+
+    return questions
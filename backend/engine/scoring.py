@@ -1,31 +1,61 @@
-import os
-import json
-from openai import OpenAI
+import logging
+import orjson
+from engine.openai_client import client
+from storage import ResponseCache
 
-# For deployment: Set OPENAI_API_KEY in your hosting platform's environment variables
-# Render: Dashboard → Environment → Add OPENAI_API_KEY
-# Railway: Variables tab → Add OPENAI_API_KEY
-# Fly.io: fly secrets set OPENAI_API_KEY=sk-...
+logger = logging.getLogger("adaptive.scoring")
 
-client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+# Identical prompts (copy-pasted answers, resubmissions, a misconception that
+# keeps coming up) reuse the first validated reply for a day. In-process by
+# default; the app swaps in a Redis-backed cache when available.
+reply_cache = ResponseCache(namespace="reply", ttl=24 * 3600, maxsize=4096)
 
-def evaluate_answer(question, resp):
-    """Evaluate a student's answer using OpenAI API with error handling."""
-    try:
-        prompt = f"""Evaluate the student's response to this Python question.
 
-Question: {question['question']}
-Correct Answer: {question['answer']}
-Student Answer: {resp.get('student_answer', '')}
-Student Explanation: {resp.get('explanation', '')}
+def set_reply_cache(cache: ResponseCache):
+    """Replace the cache used for evaluation and follow-up replies."""
+    global reply_cache
+    reply_cache = cache
+
+
+async def complete_json(prompt, temperature, required_fields):
+    """Ask the model for a JSON object, memoized on the prompt. Raises on an incomplete reply."""
+    key = ResponseCache.key(prompt)
+    cached = await reply_cache.get(key)
+    if cached is not None:
+        return cached
+    
+    response = await client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[{"role": "user", "content": prompt}],
+        response_format={"type": "json_object"},
+        temperature=temperature
+    )
+    
+    result = orjson.loads(response.choices[0].message.content)
+    
+    # Validate required fields
+    for field in required_fields:
+        if field not in result:
+            raise ValueError(f"Missing required field: {field}")
+    
+    await reply_cache.set(key, result)
+    return result
+
+
+_EVAL_PROMPT = """Evaluate the student's response to this Python question.
+
+Question: %s
+Correct Answer: %s
+Student Answer: %s
+Student Explanation: %s
 
 Evaluate the response and return ONLY valid JSON in this exact format:
-{{
+{
  "accuracy": 0.0,
  "explanation_score": 0.0,
  "final_score": 0.0,
  "misconceptions": []
-}}
+}
 
 Where:
 - accuracy: 0.0-1.0 score for correctness of the answer
@@ -34,33 +64,31 @@ Where:
 - misconceptions: array of strings describing any misconceptions (empty if none)
 """
 
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"},
-            temperature=0.3
+
+async def evaluate_answer(question, resp):
+    """Evaluate a student's answer using OpenAI API with error handling."""
+    try:
+        prompt = _EVAL_PROMPT % (
+            question['question'],
+            question['answer'],
+            resp.get('student_answer', ''),
+            resp.get('explanation', ''),
+        )
+
+        return await complete_json(
+            prompt, 0.3, ["accuracy", "explanation_score", "final_score", "misconceptions"]
         )
         
-        result = json.loads(response.choices[0].message.content)
-        
-        # Validate required fields
-        required_fields = ["accuracy", "explanation_score", "final_score", "misconceptions"]
-        for field in required_fields:
-            if field not in result:
-                raise ValueError(f"Missing required field: {field}")
-        
-        return result
-        
-    except json.JSONDecodeError as e:
-        print(f"JSON parsing error: {e}")
+    except orjson.JSONDecodeError as e:
+        logger.warning("JSON parsing error: %s", e)
         return {
             "accuracy": 0.0,
             "explanation_score": 0.0,
             "final_score": 0.0,
             "misconceptions": ["Error evaluating response"]
         }
-    except Exception as e:
-        print(f"Error evaluating answer: {e}")
+    except Exception:
+        logger.exception("Evaluating answer failed")
         return {
             "accuracy": 0.0,
             "explanation_score": 0.0,
@@ -69,7 +97,7 @@ Where:
         }
 
 
-def generate_followup_question(bloom, difficulty, misconception):
+async def generate_followup_question(bloom, difficulty, misconception):
     """Generate a follow-up question targeting a specific misconception."""
     try:
         prompt = f"""Generate a Python programming question for a first-year student.
@@ -89,25 +117,12 @@ Return ONLY valid JSON in this exact format:
 }}
 """
 
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"},
-            temperature=0.7
+        return await complete_json(
+            prompt, 0.7, ["id", "bloom", "difficulty", "question", "answer", "misconceptions"]
         )
         
-        result = json.loads(response.choices[0].message.content)
-        
-        # Validate required fields
-        required_fields = ["id", "bloom", "difficulty", "question", "answer", "misconceptions"]
-        for field in required_fields:
-            if field not in result:
-                raise ValueError(f"Missing required field: {field}")
-        
-        return result
-        
-    except Exception as e:
-        print(f"Error generating follow-up question: {e}")
+    except Exception:
+        logger.exception("Generating follow-up question failed")
         # Return a safe fallback question
         return {
             "id": 999,
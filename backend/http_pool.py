@@ -0,0 +1,15 @@
+"""
+Connection pool settings shared by the outbound HTTP clients
+"""
+
+import httpx
+
+# Calls to OpenAI and the LMS arrive seconds to minutes apart, so idle
+# connections are kept for five minutes rather than httpx's default five
+# seconds, which would mean a fresh TLS handshake for nearly every call
+KEEPALIVE_EXPIRY = 300.0
+
+
+def pool_limits(max_keepalive_connections: int) -> httpx.Limits:
+    """Limits for a client that keeps idle connections for KEEPALIVE_EXPIRY seconds"""
+    return httpx.Limits(max_keepalive_connections=max_keepalive_connections, keepalive_expiry=KEEPALIVE_EXPIRY)
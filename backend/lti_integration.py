@@ -3,16 +3,52 @@ LTI 1.3 Integration for Canvas LMS
 Handles OAuth2 authentication and grade passback
 """
 
+import base64
+import functools
+import asyncio
 import os
-import json
+import sys
+import threading
 import time
 import jwt
-from typing import Optional, Dict
+import httpx
+import logging
+import orjson
+from typing import Optional, Dict, Tuple
+from cachetools import TTLCache
+from dataclasses import dataclass
+from jwt.algorithms import RSAAlgorithm
+from http_pool import pool_limits
 from datetime import datetime, timedelta
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric import rsa
 from cryptography.hazmat.backends import default_backend
 
+logger = logging.getLogger("adaptive.lti")
+
+# Cached Canvas access tokens are replaced this many seconds before expiry
+TOKEN_REFRESH_MARGIN = 30
+
+# A token signed with an unknown kid refetches the platform keyset at most
+# this often, so forged tokens cannot force an outbound request per launch
+JWKS_REFETCH_INTERVAL = 60
+
+# LTI claim names, interned once since every launch looks them up
+MESSAGE_TYPE_CLAIM = sys.intern("https://purl.imsglobal.org/spec/lti/claim/message_type")
+VERSION_CLAIM = sys.intern("https://purl.imsglobal.org/spec/lti/claim/version")
+AGS_ENDPOINT_CLAIM = sys.intern("https://purl.imsglobal.org/spec/lti-ags/claim/endpoint")
+_REQUIRED_CLAIMS = (MESSAGE_TYPE_CLAIM, VERSION_CLAIM)
+
+
+@dataclass(slots=True)
+class LaunchClaims:
+    """The launch token claims the tool uses"""
+    sub: str
+    nonce: str
+    name: str = "Student"
+    ags_endpoint: Optional[Dict] = None
+
+
 class LTIConfig:
     """LTI 1.3 Configuration"""
     
@@ -32,14 +68,23 @@ class LTIConfig:
         self.auth_token_url = f"{self.issuer}/login/oauth2/token"
         self.keyset_url = f"{self.issuer}/api/lti/security/jwks"
         
-        # Private key for signing (generate on first run)
-        self.private_key = self._get_or_generate_private_key()
+        # Private key for signing (generate on first run); parsed once per process
+        self.private_key = load_private_key()
         self.public_key = self.private_key.public_key()
     
-    def _get_or_generate_private_key(self):
-        """Generate or load RSA private key"""
-        key_path = "lti_private_key.pem"
-        
+    def get_public_jwks(self) -> Dict:
+        """Get public key in JWKS format for Canvas"""
+        return public_jwks(self.private_key)
+
+
+_private_key_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=1)
+def load_private_key(key_path: str = "lti_private_key.pem"):
+    """Generate or load RSA private key, cached for the life of the process"""
+    # The lock stops two first-run callers from each writing a different key
+    with _private_key_lock:
         if os.path.exists(key_path):
             with open(key_path, "rb") as f:
                 return serialization.load_pem_private_key(
@@ -47,118 +92,159 @@ class LTIConfig:
                     password=None,
                     backend=default_backend()
                 )
-        else:
-            # Generate new key
-            private_key = rsa.generate_private_key(
-                public_exponent=65537,
-                key_size=2048,
-                backend=default_backend()
-            )
-            
-            # Save for reuse
-            pem = private_key.private_bytes(
-                encoding=serialization.Encoding.PEM,
-                format=serialization.PrivateFormat.PKCS8,
-                encryption_algorithm=serialization.NoEncryption()
-            )
-            
-            with open(key_path, "wb") as f:
-                f.write(pem)
-            
-            return private_key
-    
-    def get_public_jwks(self) -> Dict:
-        """Get public key in JWKS format for Canvas"""
-        public_numbers = self.public_key.public_numbers()
         
-        # Convert to base64url format
-        def int_to_base64url(n):
-            import base64
-            byte_length = (n.bit_length() + 7) // 8
-            n_bytes = n.to_bytes(byte_length, byteorder='big')
-            return base64.urlsafe_b64encode(n_bytes).decode('utf-8').rstrip('=')
+        # Generate new key
+        private_key = rsa.generate_private_key(
+            public_exponent=65537,
+            key_size=2048,
+            backend=default_backend()
+        )
+        
+        # Save for reuse
+        pem = private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption()
+        )
+        
+        with open(key_path, "wb") as f:
+            f.write(pem)
         
-        return {
-            "keys": [
-                {
-                    "kty": "RSA",
-                    "alg": "RS256",
-                    "use": "sig",
-                    "kid": "1",
-                    "n": int_to_base64url(public_numbers.n),
-                    "e": int_to_base64url(public_numbers.e)
-                }
-            ]
-        }
+        return private_key
+
+
+def int_to_base64url(n: int) -> str:
+    byte_length = (n.bit_length() + 7) // 8
+    n_bytes = n.to_bytes(byte_length, byteorder='big')
+    return base64.urlsafe_b64encode(n_bytes).decode('utf-8').rstrip('=')
+
+
+@functools.lru_cache(maxsize=1)
+def public_jwks(private_key) -> Dict:
+    """JWKS for the tool's signing key; n and e never change, so it is built once"""
+    public_numbers = private_key.public_key().public_numbers()
+    return {
+        "keys": [
+            {
+                "kty": "RSA",
+                "alg": "RS256",
+                "use": "sig",
+                "kid": "1",
+                "n": int_to_base64url(public_numbers.n),
+                "e": int_to_base64url(public_numbers.e)
+            }
+        ]
+    }
 
 
 class LTIValidator:
     """Validates LTI launch requests"""
     
-    def __init__(self, config: LTIConfig):
+    def __init__(self, config: LTIConfig, client: Optional[httpx.AsyncClient] = None):
         self.config = config
+        self.client = client
+        # Platform signing keys by kid. Platforms rotate keys rarely, so the
+        # keyset is fetched once an hour instead of on every launch.
+        self._jwks_cache = TTLCache(maxsize=16, ttl=3600)
+        self._jwks_fetched_at = float("-inf")  # Monotonic time of the last keyset request
+        self._jwks_lock = asyncio.Lock()
     
-    def validate_launch(self, id_token: str) -> Optional[Dict]:
-        """
-        Validate LTI 1.3 launch token
-        Returns decoded claims if valid, None if invalid
+    async def _get_signing_key(self, kid: Optional[str]):
+        """Return the platform public key for kid, fetching the keyset on a miss
+
+        Misses refetch at most once per JWKS_REFETCH_INTERVAL; tokens without
+        a kid are rejected without a fetch.
         """
-        try:
-            # Decode without verification first to get header
-            unverified = jwt.decode(id_token, options={"verify_signature": False})
+        if not kid:
+            return None
+        key = self._jwks_cache.get(kid)
+        if key is not None:
+            return key
+        
+        # Concurrent misses share one fetch
+        async with self._jwks_lock:
+            key = self._jwks_cache.get(kid)
+            if key is not None or time.monotonic() - self._jwks_fetched_at < JWKS_REFETCH_INTERVAL:
+                return key
             
-            # Verify required claims
-            required_claims = [
-                "iss",  # Issuer (Canvas)
-                "aud",  # Audience (your client_id)
-                "sub",  # Subject (user ID)
-                "exp",  # Expiration
-                "iat",  # Issued at
-                "nonce",  # Nonce for security
-                "https://purl.imsglobal.org/spec/lti/claim/message_type",
-                "https://purl.imsglobal.org/spec/lti/claim/version",
-            ]
+            # Stamped before the request so failed fetches are rate limited too
+            self._jwks_fetched_at = time.monotonic()
+            response = await self.client.get(self.config.keyset_url)
+            response.raise_for_status()
             
-            for claim in required_claims:
-                if claim not in unverified:
-                    print(f"Missing required claim: {claim}")
-                    return None
+            for jwk in orjson.loads(response.content).get("keys", []):
+                if jwk.get("kid"):
+                    self._jwks_cache[jwk["kid"]] = RSAAlgorithm.from_jwk(jwk)
             
-            # Verify issuer and audience
-            if unverified["iss"] != self.config.issuer:
-                print(f"Invalid issuer: {unverified['iss']}")
+            return self._jwks_cache.get(kid)
+    
+    async def validate_launch(self, id_token: str) -> Optional[LaunchClaims]:
+        """
+        Validate LTI 1.3 launch token
+        Returns the launch claims if valid, None if invalid
+        """
+        try:
+            kid = jwt.get_unverified_header(id_token).get("kid")
+            key = await self._get_signing_key(kid)
+            if key is None:
+                logger.warning("Unknown signing key: %s", kid)
                 return None
             
-            if unverified["aud"] != self.config.client_id:
-                print(f"Invalid audience: {unverified['aud']}")
-                return None
+            # Verifies signature, exp, iat, aud and iss, and requires the standard claims
+            claims = jwt.decode(
+                id_token,
+                key,
+                algorithms=["RS256"],
+                audience=self.config.client_id,
+                issuer=self.config.issuer,
+                leeway=30,  # Tolerate clock skew with the platform
+                options={"require": ["iss", "aud", "sub", "exp", "iat", "nonce"]},
+            )
             
-            # In production, fetch Canvas public key and verify signature
-            # For now, we'll trust the token if claims are valid
-            # TODO: Implement proper signature verification with Canvas public key
+            # Verify LTI-specific claims
+            for claim in _REQUIRED_CLAIMS:
+                if claim not in claims:
+                    logger.warning("Missing required claim: %s", claim)
+                    return None
             
-            return unverified
+            return LaunchClaims(
+                sub=claims["sub"],
+                nonce=claims["nonce"],
+                name=claims.get("name", "Student"),
+                ags_endpoint=claims.get(AGS_ENDPOINT_CLAIM),
+            )
             
         except jwt.ExpiredSignatureError:
-            print("Token has expired")
+            logger.info("Token has expired")
             return None
         except jwt.InvalidTokenError as e:
-            print(f"Invalid token: {e}")
+            logger.warning("Invalid token: %s", e)
             return None
-        except Exception as e:
-            print(f"Error validating token: {e}")
+        except Exception:
+            logger.exception("Error validating token")
             return None
 
 
+def create_http_client() -> httpx.AsyncClient:
+    """Shared keep-alive HTTP/2 client for calls to the LMS"""
+    return httpx.AsyncClient(http2=True, timeout=10.0, limits=pool_limits(50))
+
+
 class LTIGradeSubmitter:
     """Handles grade passback to Canvas"""
     
-    def __init__(self, config: LTIConfig):
+    def __init__(self, config: LTIConfig, client: Optional[httpx.AsyncClient] = None):
         self.config = config
+        # Opened at app startup so TLS connections are reused across submissions
+        self.client = client
+        # One client-credentials token serves every submission until shortly
+        # before it expires: (token, refresh deadline on the monotonic clock)
+        self._access_token: Optional[Tuple[str, float]] = None
+        self._token_lock = asyncio.Lock()
     
-    def submit_grade(
+    async def submit_grade(
         self,
-        id_token_claims: Dict,
+        claims: LaunchClaims,
         score: float,
         max_score: float = 1.0,
         comment: str = ""
@@ -167,7 +253,7 @@ class LTIGradeSubmitter:
         Submit grade back to Canvas using LTI Advantage Assignment and Grade Services
         
         Args:
-            id_token_claims: Claims from the LTI launch token
+            claims: Claims from the LTI launch token
             score: Student's score (0.0 to max_score)
             max_score: Maximum possible score (default 1.0)
             comment: Optional comment about the grade
@@ -177,21 +263,19 @@ class LTIGradeSubmitter:
         """
         try:
             # Get the lineitem URL from launch claims
-            ags_claim = id_token_claims.get(
-                "https://purl.imsglobal.org/spec/lti-ags/claim/endpoint"
-            )
+            ags_claim = claims.ags_endpoint
             
             if not ags_claim:
-                print("No AGS endpoint in launch token")
+                logger.warning("No AGS endpoint in launch token")
                 return False
             
             lineitem_url = ags_claim.get("lineitem")
             if not lineitem_url:
-                print("No lineitem URL in AGS claim")
+                logger.warning("No lineitem URL in AGS claim")
                 return False
             
             # Get user ID
-            user_id = id_token_claims.get("sub")
+            user_id = claims.sub
             
             # Build grade submission
             grade_data = {
@@ -207,15 +291,12 @@ class LTIGradeSubmitter:
                 grade_data["comment"] = comment
             
             # Get access token for Canvas API
-            access_token = self._get_access_token(id_token_claims)
+            access_token = await self._get_access_token()
             if not access_token:
-                print("Failed to get access token")
+                logger.warning("Failed to get access token")
                 return False
             
             # Submit grade to Canvas
-            import requests
-            
-            scores_url = ags_claim.get("scope", [])
             scores_url = lineitem_url + "/scores"
             
             headers = {
@@ -223,26 +304,47 @@ class LTIGradeSubmitter:
                 "Content-Type": "application/vnd.ims.lis.v1.score+json"
             }
             
-            response = requests.post(scores_url, json=grade_data, headers=headers)
+            response = await self.client.post(scores_url, content=orjson.dumps(grade_data), headers=headers)
             
             if response.status_code in [200, 201]:
-                print(f"Grade submitted successfully: {score}/{max_score}")
+                logger.debug("Grade submitted successfully: %s/%s", score, max_score)
                 return True
             else:
-                print(f"Failed to submit grade: {response.status_code} - {response.text}")
+                logger.warning("Failed to submit grade: %s - %s", response.status_code, response.text)
                 return False
                 
-        except Exception as e:
-            print(f"Error submitting grade: {e}")
+        except Exception:
+            logger.exception("Error submitting grade")
             return False
     
-    def _get_access_token(self, id_token_claims: Dict) -> Optional[str]:
+    async def _get_access_token(self) -> Optional[str]:
         """
-        Get Canvas API access token using client credentials
+        Get Canvas API access token, reusing the cached one while it is fresh
         """
-        try:
-            import requests
+        cached = self._access_token
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+        
+        # A burst of submissions signs and requests a single token
+        async with self._token_lock:
+            cached = self._access_token
+            if cached and cached[1] > time.monotonic():
+                return cached[0]
+            
+            issued_at = time.monotonic()
+            body = await self._request_access_token()
+            if not body or not body.get("access_token"):
+                return None
             
+            expires_in = body.get("expires_in", 3600)
+            self._access_token = (body["access_token"], issued_at + expires_in - TOKEN_REFRESH_MARGIN)
+            return body["access_token"]
+    
+    async def _request_access_token(self) -> Optional[Dict]:
+        """
+        Request a Canvas API access token using client credentials
+        """
+        try:
             # Create JWT for client assertion
             now = int(time.time())
             jwt_claim = {
@@ -269,34 +371,15 @@ class LTIGradeSubmitter:
                 "scope": "https://purl.imsglobal.org/spec/lti-ags/scope/score"
             }
             
-            response = requests.post(self.config.auth_token_url, data=token_data)
+            response = await self.client.post(self.config.auth_token_url, data=token_data)
             
             if response.status_code == 200:
-                return response.json().get("access_token")
+                return orjson.loads(response.content)
             else:
-                print(f"Token request failed: {response.status_code} - {response.text}")
+                logger.warning("Token request failed: %s - %s", response.status_code, response.text)
                 return None
                 
-        except Exception as e:
-            print(f"Error getting access token: {e}")
+        except Exception:
+            logger.exception("Error getting access token")
             return None
 
-
-# Session storage for LTI launches
-lti_sessions = {}
-
-def store_lti_session(session_id: str, lti_claims: Dict):
-    """Store LTI launch data for grade passback later"""
-    lti_sessions[session_id] = {
-        "claims": lti_claims,
-        "timestamp": time.time()
-    }
-
-def get_lti_session(session_id: str) -> Optional[Dict]:
-    """Retrieve LTI launch data"""
-    session = lti_sessions.get(session_id)
-    if session:
-        # Check if session is less than 2 hours old
-        if time.time() - session["timestamp"] < 7200:
-            return session["claims"]
-    return None
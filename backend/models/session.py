@@ -1,13 +1,58 @@
+import math
+from array import array
+from dataclasses import dataclass, field
+from statistics import fmean
+from typing import Dict, List, Optional
+
+BLOOM_ORDER = ["Remember", "Understand", "Apply", "Analyze", "Evaluate"]
+BLOOM_INDEX = {bloom: i for i, bloom in enumerate(BLOOM_ORDER)}
+SCORE_FIELDS = ('accuracy', 'explanation_score', 'final_score')
+
+
+def _as_score(value) -> float:
+    """A model-reported score as a float; missing, null, non-numeric or non-finite counts as 0.0"""
+    try:
+        score = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return score if math.isfinite(score) else 0.0
+
+
+@dataclass(slots=True)
+class SessionSummary:
+    """End-of-session statistics; orjson serializes it like the dict it replaces."""
+    final_score: float
+    average_accuracy: float
+    average_explanation: float
+    responses: List[Dict]
+    ai_adaptation_summary: str
+    total_questions: int = 0
+    ai_decisions: List[Dict] = field(default_factory=list)
+    grade_submitted: Optional[str] = None  # "queued" once LTI grade passback is scheduled
+
+
 class SessionState:
     """Manages the state of a student's assessment session with AI-driven adaptation."""
     
+    # Every field is assigned in reset(); no instance dict is needed
+    __slots__ = (
+        'bloom_idx', 'difficulty',
+        'max_questions', 'question_number',
+        'current_question', 'finished',
+        'history', '_sum_acc', '_sum_exp', '_sum_final',
+        '_dec_qnum', '_dec_bloom', '_dec_diff', '_dec_rationale', '_dec_score',
+        'asked_questions', 'asked_topics',
+        'last_misconception', 'asked_question_mask',
+    )
+    
     def __init__(self):
         self.reset()
 
     def reset(self):
         """Reset session to initial state."""
-        # Starting parameters (AI will adjust these)
-        self.bloom_level = "Remember"
+        # Starting parameters (AI will adjust these); the Bloom level is kept
+        # as its position in BLOOM_ORDER
+        self.bloom_idx = 0
         self.difficulty = 1
         
         # Session configuration
@@ -20,9 +65,17 @@ class SessionState:
         
         # Performance tracking
         self.history = []  # Full evaluation history with questions
+        # Running totals over history, kept by record_evaluation
+        self._sum_acc = self._sum_exp = self._sum_final = 0.0
         
         # AI adaptation tracking
-        self.ai_decisions = []  # Track AI's rationale for each question
+        # Track AI's rationale for each question, one column per field;
+        # ai_decisions() assembles the records when a summary asks for them
+        self._dec_qnum = array('i')
+        self._dec_bloom = []
+        self._dec_diff = []  # AI-chosen values, not guaranteed to be ints
+        self._dec_rationale = []
+        self._dec_score = array('d')
         
         # Memory: Track asked questions to prevent duplicates
         self.asked_questions = []  # Store full question text
@@ -30,11 +83,30 @@ class SessionState:
         
         # Legacy fields (kept for compatibility, but AI now decides these)
         self.last_misconception = None
-        self.asked_question_ids = set()
+        self.asked_question_mask = 0  # Bank ids already asked; bit n set for id n
+
+    @property
+    def bloom_level(self):
+        return BLOOM_ORDER[self.bloom_idx]
+
+    @bloom_level.setter
+    def bloom_level(self, level):
+        # Unrecognised names leave the level unchanged
+        self.bloom_idx = BLOOM_INDEX.get(level, self.bloom_idx)
 
     def record_evaluation(self, evaluation):
-        """Record an evaluation result with question context in history."""
+        """Record an evaluation result with question context in history.
+
+        The scores are coerced to floats, in the evaluation itself, before any
+        state changes, so history and the running totals always agree.
+        """
+        acc, exp, final = (_as_score(evaluation.get(name)) for name in SCORE_FIELDS)
+        evaluation.update(accuracy=acc, explanation_score=exp, final_score=final)
+        
         self.history.append(evaluation)
+        self._sum_acc += acc
+        self._sum_exp += exp
+        self._sum_final += final
         
         # Store asked question in memory to prevent duplicates
         if isinstance(evaluation.get('question'), dict):
@@ -44,71 +116,75 @@ class SessionState:
                 self.asked_questions.append(question_text)
             
             # Track topics/concepts covered
-            if 'targets' in question:
-                self.asked_topics.update(question['targets'])
-            if 'focus_areas' in question:
-                self.asked_topics.update(question['focus_areas'])
+            self.asked_topics.update(question.get('targets') or ())
+            self.asked_topics.update(question.get('focus_areas') or ())
         
         # Track AI's decision rationale if present
         if isinstance(evaluation.get('question'), dict):
             question = evaluation['question']
             if 'ai_rationale' in question:
-                self.ai_decisions.append({
-                    'question_number': self.question_number - 1,
-                    'bloom': question.get('bloom'),
-                    'difficulty': question.get('difficulty'),
-                    'rationale': question.get('ai_rationale'),
-                    'score': evaluation.get('final_score', 0)
-                })
+                self._dec_qnum.append(self.question_number - 1)
+                self._dec_bloom.append(question.get('bloom'))
+                self._dec_diff.append(question.get('difficulty'))
+                self._dec_rationale.append(question.get('ai_rationale'))
+                self._dec_score.append(final)
+
+    def ai_decisions(self):
+        """AI decision records, one dict per AI-generated question answered."""
+        return [
+            {
+                'question_number': qnum,
+                'bloom': bloom,
+                'difficulty': difficulty,
+                'rationale': rationale,
+                'score': score,
+            }
+            for qnum, bloom, difficulty, rationale, score in zip(
+                self._dec_qnum, self._dec_bloom, self._dec_diff, self._dec_rationale, self._dec_score
+            )
+        ]
 
     def summary(self):
         """Generate summary statistics for the session."""
         if not self.history:
-            return {
-                "final_score": 0.0,
-                "average_accuracy": 0.0,
-                "average_explanation": 0.0,
-                "responses": [],
-                "ai_adaptation_summary": "No questions completed"
-            }
+            return SessionSummary(0.0, 0.0, 0.0, [], "No questions completed")
         
-        acc = sum(i['accuracy'] for i in self.history) / len(self.history)
-        exp = sum(i['explanation_score'] for i in self.history) / len(self.history)
-        final = sum(i['final_score'] for i in self.history) / len(self.history)
+        total = len(self.history)
+        acc = self._sum_acc / total
+        exp = self._sum_exp / total
+        final = self._sum_final / total
         
         # Generate AI adaptation narrative
         adaptation_summary = self._generate_adaptation_summary()
         
-        return {
-            "final_score": final,
-            "average_accuracy": acc,
-            "average_explanation": exp,
-            "responses": self.history,
-            "total_questions": len(self.history),
-            "ai_adaptation_summary": adaptation_summary,
-            "ai_decisions": self.ai_decisions
-        }
+        return SessionSummary(
+            final_score=final,
+            average_accuracy=acc,
+            average_explanation=exp,
+            responses=self.history,
+            ai_adaptation_summary=adaptation_summary,
+            total_questions=total,
+            ai_decisions=self.ai_decisions(),
+        )
     
     def _generate_adaptation_summary(self) -> str:
         """Generate human-readable summary of AI's adaptation decisions."""
-        if not self.ai_decisions:
+        if not self._dec_score:
             return "AI-driven adaptive assessment with autonomous question generation"
         
         summary_parts = []
         
         # Starting and ending levels
-        first = self.ai_decisions[0]
-        last = self.ai_decisions[-1]
-        
         summary_parts.append(
-            f"Started at Bloom Level '{first['bloom']}' (Difficulty {first['difficulty']}), "
-            f"progressed to '{last['bloom']}' (Difficulty {last['difficulty']})"
+            f"Started at Bloom Level '{self._dec_bloom[0]}' (Difficulty {self._dec_diff[0]}), "
+            f"progressed to '{self._dec_bloom[-1]}' (Difficulty {self._dec_diff[-1]})"
         )
         
         # Performance trend
-        scores = [d['score'] for d in self.ai_decisions]
-        avg_first_half = sum(scores[:len(scores)//2]) / max(len(scores)//2, 1)
-        avg_second_half = sum(scores[len(scores)//2:]) / max(len(scores) - len(scores)//2, 1)
+        scores = self._dec_score
+        half = len(scores) // 2
+        avg_first_half = fmean(scores[:half]) if half else 0.0
+        avg_second_half = fmean(scores[half:])  # Never empty: at least one decision
         
         if avg_second_half > avg_first_half + 0.1:
             summary_parts.append("Performance improved throughout assessment")
@@ -117,4 +193,4 @@ class SessionState:
         else:
             summary_parts.append("Maintained consistent performance level")
         
-        return ". ".join(summary_parts)
\ No newline at end of file
+        return ". ".join(summary_parts)
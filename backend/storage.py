@@ -0,0 +1,264 @@
+"""
+Shared session storage
+Backed by Redis when REDIS_URL is set so every uvicorn worker sees the same
+sessions; falls back to an in-process store for local development
+"""
+
+import hashlib
+import os
+import pickle
+import time
+from typing import Dict, Optional
+
+import orjson
+import redis.asyncio as redis
+from cachetools import TLRUCache, TTLCache
+
+from models.session import SessionState
+
+SESSION_TTL = 3600  # Seconds of inactivity before a session is evicted
+
+# Sorted set of live session ids scored by expiry time, so the count covers
+# sessions only (not metadata, nonces or cached replies sharing the DB) and
+# drops sessions Redis has expired
+SESSION_INDEX_KEY = "session_index"
+
+
+def create_redis_client() -> Optional[redis.Redis]:
+    """Create a pooled Redis client from REDIS_URL, or None when it is unset"""
+    url = os.environ.get("REDIS_URL")
+    if not url:
+        return None
+
+    # Roughly two connections per worker; the blocking pool makes bursts wait
+    # for a free connection instead of failing with "Too many connections"
+    workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+    pool_size = int(os.environ.get("REDIS_POOL_SIZE", max(10, 2 * workers)))
+    pool = redis.BlockingConnectionPool.from_url(url, max_connections=pool_size)
+    return redis.Redis(connection_pool=pool)
+
+
+class SessionStore:
+    """Stores pickled SessionState objects with TTL eviction
+
+    Alongside each pickled state a small metadata hash holds the fields the
+    status endpoint reports, so polling never has to unpickle the history.
+    """
+
+    def __init__(self, redis_client: Optional[redis.Redis] = None, maxsize: int = 10000):
+        self.redis = redis_client
+
+        # In-process fallback: session_id -> (expires_at, pickled state, metadata, LTI claims).
+        # Each entry expires at its own expires_at and the least recently
+        # used go first when full, so abandoned sessions never pile up.
+        self._local: TLRUCache = TLRUCache(maxsize=maxsize, ttu=lambda _key, entry, _now: entry[0])
+
+    @staticmethod
+    def _key(session_id: str) -> str:
+        return f"session:{session_id}"
+
+    @staticmethod
+    def _meta_key(session_id: str) -> str:
+        return f"sess_meta:{session_id}"
+
+    @staticmethod
+    def _lti_key(session_id: str) -> str:
+        return f"lti:{session_id}"
+
+    @staticmethod
+    def _metadata(state: SessionState, is_lti: Optional[bool]) -> Dict:
+        meta = {
+            "question_number": state.question_number,
+            "max_questions": state.max_questions,
+            "bloom_level": state.bloom_level,
+            "difficulty": state.difficulty,
+            "finished": state.finished,
+        }
+        if is_lti is not None:
+            meta["is_lti_session"] = is_lti
+        return meta
+
+    async def get(self, session_id: str) -> Optional[SessionState]:
+        """Load a session, or None if it does not exist or has expired"""
+        if self.redis is not None:
+            payload = await self.redis.get(self._key(session_id))
+        else:
+            entry = self._local.get(session_id)
+            payload = entry[1] if entry else None
+
+        if payload is None:
+            return None
+        return pickle.loads(payload)
+
+    async def get_status(self, session_id: str) -> Optional[Dict]:
+        """Load only the session metadata, or None if the session is gone"""
+        if self.redis is not None:
+            raw = await self.redis.hgetall(self._meta_key(session_id))
+            if not raw:
+                return None
+            meta = {field.decode(): orjson.loads(value) for field, value in raw.items()}
+        else:
+            entry = self._local.get(session_id)
+            if not entry:
+                return None
+            meta = dict(entry[2])
+
+        meta.setdefault("is_lti_session", False)
+        return meta
+
+    async def set(
+        self,
+        session_id: str,
+        state: SessionState,
+        ttl: int = SESSION_TTL,
+        is_lti: Optional[bool] = None,
+        lti_claims: Optional[Dict] = None,
+    ):
+        """Save a session and (re)start its expiry timer
+
+        is_lti and lti_claims only need to be passed when the session is
+        created; later saves keep what was stored and extend its TTL.
+        """
+        if lti_claims is not None:
+            is_lti = True
+        payload = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+        meta = self._metadata(state, is_lti)
+
+        if self.redis is not None:
+            meta_key = self._meta_key(session_id)
+            lti_key = self._lti_key(session_id)
+            async with self.redis.pipeline() as pipe:
+                pipe.set(self._key(session_id), payload, ex=ttl)
+                pipe.zadd(SESSION_INDEX_KEY, {session_id: time.time() + ttl})
+                pipe.hset(meta_key, mapping={k: orjson.dumps(v) for k, v in meta.items()})
+                pipe.expire(meta_key, ttl)
+                if lti_claims is not None:
+                    pipe.set(lti_key, orjson.dumps(lti_claims), ex=ttl)
+                else:
+                    pipe.expire(lti_key, ttl)
+                await pipe.execute()
+        else:
+            previous = self._local.get(session_id)
+            if previous:
+                if is_lti is None and "is_lti_session" in previous[2]:
+                    meta["is_lti_session"] = previous[2]["is_lti_session"]
+                if lti_claims is None:
+                    lti_claims = previous[3]
+            self._local[session_id] = (time.monotonic() + ttl, payload, meta, lti_claims)
+
+    async def delete(self, session_id: str) -> bool:
+        """Remove a session. Returns True if it existed."""
+        if self.redis is not None:
+            async with self.redis.pipeline() as pipe:
+                pipe.delete(self._key(session_id), self._meta_key(session_id), self._lti_key(session_id))
+                pipe.zrem(SESSION_INDEX_KEY, session_id)
+                deleted, _ = await pipe.execute()
+            return deleted > 0
+
+        return self._local.pop(session_id, None) is not None
+
+    async def close(self, session_id: str) -> Optional[Dict]:
+        """Remove a finished session and return its LTI launch claims, if any
+
+        Reading the claims and deleting every key for the session happen in
+        a single round trip.
+        """
+        if self.redis is not None:
+            async with self.redis.pipeline() as pipe:
+                pipe.getdel(self._lti_key(session_id))
+                pipe.delete(self._key(session_id), self._meta_key(session_id))
+                pipe.zrem(SESSION_INDEX_KEY, session_id)
+                raw_claims, _, _ = await pipe.execute()
+            return orjson.loads(raw_claims) if raw_claims else None
+
+        entry = self._local.pop(session_id, None)
+        return entry[3] if entry else None
+
+    async def count(self) -> int:
+        """Number of live sessions"""
+        if self.redis is not None:
+            async with self.redis.pipeline() as pipe:
+                pipe.zremrangebyscore(SESSION_INDEX_KEY, "-inf", time.time())
+                pipe.zcard(SESSION_INDEX_KEY)
+                _, count = await pipe.execute()
+            return count
+
+        self._local.expire()
+        return len(self._local)
+
+
+class NonceStore:
+    """Single-use OIDC nonces, shared across workers when Redis is available"""
+
+    def __init__(self, redis_client: Optional[redis.Redis] = None, ttl: int = 600, maxsize: int = 10000):
+        self.redis = redis_client
+        self.ttl = ttl
+
+        # In-process fallback; expired nonces are evicted by the cache itself
+        self._local: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def add(self, nonce: str) -> bool:
+        """Register a freshly issued nonce. Returns False if it already exists."""
+        if self.redis is not None:
+            return bool(await self.redis.set(f"nonce:{nonce}", "1", nx=True, ex=self.ttl))
+
+        if nonce in self._local:
+            return False
+        self._local[nonce] = True
+        return True
+
+    async def consume(self, nonce: str) -> bool:
+        """Atomically use up a nonce. Returns False if unknown, expired or already used."""
+        if self.redis is not None:
+            return await self.redis.getdel(f"nonce:{nonce}") is not None
+
+        return self._local.pop(nonce, None) is not None
+
+
+class ResponseCache:
+    """Content-addressed cache of model replies
+
+    Entries live in a small in-process TTL cache and, when Redis is
+    available, in Redis as well so every worker benefits. Values are kept
+    encoded, so each hit hands back a fresh dict the caller may modify.
+    """
+
+    def __init__(
+        self,
+        redis_client: Optional[redis.Redis] = None,
+        namespace: str = "llm",
+        ttl: int = 3600,
+        maxsize: int = 1024,
+    ):
+        self.redis = redis_client
+        self.namespace = namespace
+        self.ttl = ttl
+        self._local: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def key(*parts: str) -> bytes:
+        """128-bit BLAKE2b digest of the text a reply was generated from"""
+        digest = hashlib.blake2b(digest_size=16)
+        for part in parts:
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.digest()
+
+    def _redis_key(self, key: bytes) -> str:
+        return f"{self.namespace}:{key.hex()}"
+
+    async def get(self, key: bytes) -> Optional[Dict]:
+        """Return a cached reply, or None on a miss"""
+        raw = self._local.get(key)
+        if raw is None and self.redis is not None:
+            raw = await self.redis.get(self._redis_key(key))
+            if raw is not None:
+                self._local[key] = raw
+        return orjson.loads(raw) if raw is not None else None
+
+    async def set(self, key: bytes, value: Dict):
+        """Store a reply for ttl seconds"""
+        raw = orjson.dumps(value)
+        self._local[key] = raw
+        if self.redis is not None:
+            await self.redis.set(self._redis_key(key), raw, ex=self.ttl)
@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+# app builds its OpenAI client and LTI key at import time; keep the key out
+# of the checkout and use the in-process stores
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.pop("REDIS_URL", None)
+os.chdir(tempfile.mkdtemp())
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,83 @@
+import asyncio
+from dataclasses import asdict
+
+import orjson
+
+import app as app_module
+from lti_integration import LaunchClaims
+from models.session import SessionState
+
+
+def test_grade_submitted_when_client_disconnects_mid_stream(monkeypatch):
+    async def run():
+        scoring_started = asyncio.Event()
+        finish_scoring = asyncio.Event()
+        disconnected = asyncio.Event()
+        graded = asyncio.Event()
+        submissions = []
+
+        async def fake_score_response(session, resp):
+            scoring_started.set()
+            await finish_scoring.wait()
+            evaluation = {"accuracy": 1.0, "explanation_score": 1.0, "final_score": 1.0, "misconceptions": []}
+            session.record_evaluation(evaluation)
+            session.question_number += 1
+            return evaluation
+
+        async def fake_submit_grade(**kwargs):
+            submissions.append(kwargs)
+            graded.set()
+            return True
+
+        monkeypatch.setattr(app_module, "score_response", fake_score_response)
+        monkeypatch.setattr(app_module.lti_grade_submitter, "submit_grade", fake_submit_grade)
+
+        # One answer away from the end of an LTI session
+        session = SessionState()
+        session.question_number = session.max_questions
+        claims = LaunchClaims(sub="student-1", nonce="n", ags_endpoint={"lineitem": "https://lms.test/li"})
+        await app_module.session_store.set("sid", session, lti_claims=asdict(claims))
+
+        body = orjson.dumps({"session_id": "sid", "student_answer": "a", "explanation": "e"})
+        requests = [{"type": "http.request", "body": body, "more_body": False}]
+
+        async def receive():
+            if requests:
+                return requests.pop(0)
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        sent = []
+
+        async def send(message):
+            sent.append(message["type"])
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "POST",
+            "scheme": "http",
+            "path": "/answer",
+            "raw_path": b"/answer",
+            "query_string": b"",
+            "root_path": "",
+            "headers": [(b"accept", b"text/event-stream"), (b"content-type", b"application/json")],
+            "client": ("127.0.0.1", 1),
+            "server": ("test", 80),
+        }
+
+        call = asyncio.create_task(app_module.app(scope, receive, send))
+        await asyncio.wait_for(scoring_started.wait(), 5)
+        disconnected.set()
+        await asyncio.wait_for(call, 5)
+
+        # Scoring finishes after the stream has been torn down
+        finish_scoring.set()
+        await asyncio.wait_for(graded.wait(), 5)
+
+        assert submissions[0]["claims"] == claims
+        assert submissions[0]["score"] == 1.0
+        assert await app_module.session_store.get("sid") is None
+
+    asyncio.run(run())
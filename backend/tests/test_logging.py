@@ -0,0 +1,16 @@
+import asyncio
+import logging
+
+import app as app_module
+
+
+def test_restarts_do_not_stack_root_handlers():
+    async def cycle():
+        await app_module.start_logging()
+        await app_module.stop_logging()
+
+    before = list(logging.getLogger().handlers)
+    asyncio.run(cycle())
+    asyncio.run(cycle())
+    assert logging.getLogger().handlers == before
+    assert logging.getLogger("httpx").level == logging.WARNING
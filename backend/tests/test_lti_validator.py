@@ -0,0 +1,47 @@
+import asyncio
+
+import httpx
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from lti_integration import JWKS_REFETCH_INTERVAL, LTIConfig, LTIValidator
+
+
+def make_validator():
+    fetches = []
+
+    def handler(request):
+        fetches.append(request.url)
+        return httpx.Response(200, json={"keys": []})
+
+    validator = LTIValidator(LTIConfig(), httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return validator, fetches
+
+
+def sign(headers=None):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return jwt.encode({"sub": "student-1"}, key, algorithm="RS256", headers=headers)
+
+
+def test_unknown_kid_refetches_keyset_at_most_once_per_interval():
+    async def run():
+        validator, fetches = make_validator()
+        token = sign({"kid": "forged"})
+        assert await validator.validate_launch(token) is None
+        assert await validator.validate_launch(token) is None
+        assert len(fetches) == 1
+
+        validator._jwks_fetched_at -= JWKS_REFETCH_INTERVAL
+        assert await validator.validate_launch(token) is None
+        assert len(fetches) == 2
+
+    asyncio.run(run())
+
+
+def test_missing_kid_is_rejected_without_fetching():
+    async def run():
+        validator, fetches = make_validator()
+        assert await validator.validate_launch(sign()) is None
+        assert fetches == []
+
+    asyncio.run(run())
@@ -0,0 +1,31 @@
+from app import accepted_encodings
+
+
+def test_zero_q_values_reject_the_encoding():
+    assert accepted_encodings("br;q=0.0, gzip; q=0.00, deflate") == {"deflate"}
+    assert accepted_encodings("br;q=0, gzip;q=0.5") == {"gzip"}
+
+
+def test_plain_and_weighted_tokens_are_accepted():
+    assert accepted_encodings("gzip, deflate, br") == {"gzip", "deflate", "br"}
+    assert accepted_encodings("BR;Q=0.8") == {"br"}
+    assert accepted_encodings("br;q=bogus") == set()
+
+
+def test_each_encoding_has_its_own_etag():
+    from starlette.testclient import TestClient
+
+    from app import LAUNCH_CSS, app
+
+    url = "/lti/assets/" + LAUNCH_CSS["name"]
+    client = TestClient(app)
+    etags = {}
+    for encoding in ("br", "gzip", "identity"):
+        response = client.get(url, headers={"Accept-Encoding": encoding})
+        assert response.status_code == 200
+        etags[encoding] = response.headers["etag"]
+        assert client.get(url, headers={"Accept-Encoding": encoding, "If-None-Match": etags[encoding]}).status_code == 304
+    assert len(set(etags.values())) == 3
+
+    # A validator for one encoding doesn't revalidate another
+    assert client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": etags["br"]}).status_code == 200
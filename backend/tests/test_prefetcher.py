@@ -0,0 +1,31 @@
+import asyncio
+
+import pytest
+
+from engine import adaptive_engine
+from engine.adaptive_engine import QuestionPrefetcher
+from models.session import SessionState
+
+
+@pytest.mark.parametrize("evaluation, expected", [
+    ({"final_score": 0.95, "misconceptions": []}, "improve"),
+    ({"final_score": 0.1, "misconceptions": []}, "decline"),
+    ({"final_score": 0.95, "misconceptions": ["off by one"]}, None),
+    ({"final_score": 0.5, "misconceptions": []}, None),
+])
+def test_prefetched_question_is_used_only_when_the_evaluation_fits(monkeypatch, evaluation, expected):
+    async def fake_request_question(prompt, question_number, session_id, on_question=None):
+        return {"branch": "improve" if "Overall Score: 100.0%" in prompt else "decline"}
+
+    async def run():
+        monkeypatch.setattr(adaptive_engine, "ENGINE_MODE", "ai")
+        monkeypatch.setattr(adaptive_engine, "request_question", fake_request_question)
+        session = SessionState()
+        session.current_question = {"question": "What is x?", "bloom": "Remember", "difficulty": 1}
+
+        prefetcher = QuestionPrefetcher()
+        prefetcher.start("sid", session)
+        question = await prefetcher.take("sid", evaluation)
+        assert (question and question["branch"]) == expected
+
+    asyncio.run(run())
@@ -0,0 +1,18 @@
+from engine.question_bank import Question, load_questions
+
+
+def test_questions_are_immutable_and_served_as_fresh_dicts(tmp_path):
+    bank = tmp_path / "questions.jsonl"
+    bank.write_bytes(
+        b'{"id":1,"bloom":"Remember","difficulty":1,"question":"q","answer":"a","misconceptions":["m"]}\n\n'
+    )
+
+    for _ in range(2):  # Parsed, then read back from the pickle cache
+        (question,) = load_questions(str(bank))
+        assert isinstance(question, Question)
+        assert question.misconceptions == ("m",)
+
+    served = question.to_dict()
+    served["misconceptions"].append("changed")
+    assert served["misconceptions"] == ["m", "changed"]
+    assert question.misconceptions == ("m",)
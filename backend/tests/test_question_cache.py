@@ -0,0 +1,31 @@
+import asyncio
+
+import pytest
+
+from engine import adaptive_engine
+from storage import ResponseCache
+
+
+class NoModel:
+    """Stands in for the OpenAI client; any call means the cache missed"""
+
+    @property
+    def beta(self):
+        raise RuntimeError("model called")
+
+
+def test_cached_questions_are_scoped_to_their_session(monkeypatch):
+    async def run():
+        cache = ResponseCache(namespace="question")
+        monkeypatch.setattr(adaptive_engine, "question_cache", cache)
+        monkeypatch.setattr(adaptive_engine, "client", NoModel())
+
+        prompt = adaptive_engine.build_question_prompt(adaptive_engine.SessionState())
+        question = {"id": "ai_1", "question": "q", "answer": "a"}
+        await cache.set(ResponseCache.key("session-a", prompt), question)
+
+        assert await adaptive_engine.request_question(prompt, 1, "session-a") == question
+        with pytest.raises(RuntimeError, match="model called"):
+            await adaptive_engine.request_question(prompt, 1, "session-b")
+
+    asyncio.run(run())
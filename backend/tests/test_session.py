@@ -0,0 +1,20 @@
+from models.session import SessionState
+
+
+def test_unusable_scores_are_recorded_as_zero_once():
+    session = SessionState()
+    evaluation = {"accuracy": None, "explanation_score": "0.5", "final_score": "n/a", "misconceptions": []}
+    session.record_evaluation(evaluation)
+
+    assert len(session.history) == 1
+    assert evaluation["accuracy"] == 0.0
+    assert evaluation["explanation_score"] == 0.5
+    summary = session.summary()
+    assert (summary.average_accuracy, summary.average_explanation, summary.final_score) == (0.0, 0.5, 0.0)
+
+
+def test_summary_of_an_empty_session():
+    summary = SessionState().summary()
+
+    assert summary.final_score == 0.0
+    assert summary.responses == []
@@ -46,7 +46,8 @@ async function submitAnswer() {
         const response = await fetch(`${API}/answer`, {
             method: "POST",
             headers: {
-                "Content-Type": "application/json"
+                "Content-Type": "application/json",
+                "Accept": "text/event-stream"
             },
             body: JSON.stringify({
                 student_answer: answer,
@@ -61,14 +62,33 @@ async function submitAnswer() {
             throw new Error(errorData.detail || `HTTP error! status: ${response.status}`);
         }
 
-        const data = await response.json();
+        // The evaluation arrives before the next question is generated, so
+        // the feedback pause overlaps generation instead of following it
+        let feedbackShown = null;
+        let data = null;
+        await readEvents(response, (event, payload) => {
+            if (event === "evaluation") {
+                showFeedback(payload);
+                feedbackShown = new Promise(resolve => setTimeout(resolve, 2000));
+            } else if (event === "result") {
+                data = payload;
+            } else if (event === "error") {
+                throw new Error(payload.detail);
+            }
+        });
+        if (!data) {
+            throw new Error("Incomplete response");
+        }
         console.log("Response data:", data);
 
-        // Show evaluation feedback
-        showFeedback(data.evaluation);
+        // The final answer has no next question, so its feedback comes with the result
+        if (!feedbackShown) {
+            showFeedback(data.evaluation);
+            feedbackShown = new Promise(resolve => setTimeout(resolve, 2000));
+        }
 
         // Wait a moment for user to read feedback
-        await new Promise(resolve => setTimeout(resolve, 2000));
+        await feedbackShown;
 
         if (data.finished) {
             showSummary(data.summary);
@@ -82,6 +102,33 @@ async function submitAnswer() {
     }
 }
 
+// Read a text/event-stream body, calling onEvent(name, data) for each event
+async function readEvents(response, onEvent) {
+    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+    let buffer = "";
+    for (;;) {
+        const { value, done } = await reader.read();
+        if (done) {
+            return;
+        }
+        buffer += value;
+
+        let end;
+        while ((end = buffer.indexOf("\n\n")) >= 0) {
+            const frame = buffer.slice(0, end);
+            buffer = buffer.slice(end + 2);
+
+            let event = "message";
+            let data = "";
+            for (const line of frame.split("\n")) {
+                if (line.startsWith("event: ")) event = line.slice(7);
+                else if (line.startsWith("data: ")) data += line.slice(6);
+            }
+            onEvent(event, JSON.parse(data));
+        }
+    }
+}
+
 // Display question
 function showQuestion(question) {
     if (!question) {
@@ -89,48 +136,34 @@ function showQuestion(question) {
         return;
     }
 
-    const app = document.getElementById("app");
-    app.innerHTML = `
-        <div class="question-container">
-            <div class="question-header">
-                <span class="question-number">Question ${question.number || '?'} of 10</span>
-                <span class="difficulty">Difficulty: ${question.difficulty || 'N/A'}</span>
-                <span class="bloom">Bloom: ${question.bloom || 'N/A'}</span>
-            </div>
-            <h2 class="question">${escapeHtml(question.question)}</h2>
-            
-            <div class="form-group">
-                <label for="answer">Your Answer:</label>
-                <textarea 
-                    id="answer" 
-                    placeholder="Enter your answer here..." 
-                    rows="4"
-                ></textarea>
-            </div>
-            
-            <div class="form-group">
-                <label for="explanation">Explain Your Reasoning:</label>
-                <textarea 
-                    id="explanation" 
-                    placeholder="Explain why you believe this is the correct answer..." 
-                    rows="4"
-                ></textarea>
-            </div>
-            
-            <button onclick="submitAnswer()" class="submit-btn">Submit Answer</button>
-        </div>
-    `;
+    // Fill a clone of the parsed template; textContent needs no escaping
+    const view = document.getElementById("question-tpl").content.cloneNode(true);
+    view.querySelector(".question-number").textContent = `Question ${question.number || '?'} of 10`;
+    view.querySelector(".difficulty").textContent = `Difficulty: ${question.difficulty || 'N/A'}`;
+    view.querySelector(".bloom").textContent = `Bloom: ${question.bloom || 'N/A'}`;
+    view.querySelector(".question").textContent = question.question;
+    document.getElementById("app").replaceChildren(view);
 
     // Focus on first input
     document.getElementById("answer").focus();
 }
 
+// Score colour per tenth: below 50% poor, below 70% okay, otherwise good
+const SCORE_CLASSES = [
+    'poor', 'poor', 'poor', 'poor', 'poor',
+    'okay', 'okay',
+    'good', 'good', 'good', 'good'
+];
+
+function scoreClassFor(score) {
+    return SCORE_CLASSES[Math.max(0, Math.min(10, Math.floor(score * 10)))];
+}
+
 // Show evaluation feedback
 function showFeedback(evaluation) {
     const app = document.getElementById("app");
 
-    const scoreClass = evaluation.final_score >= 0.7 ? 'good' :
-        evaluation.final_score >= 0.5 ? 'okay' : 'poor';
+    const scoreClass = scoreClassFor(evaluation.final_score);
 
     let misconceptionsHtml = '';
     if (evaluation.misconceptions && evaluation.misconceptions.length > 0) {
@@ -172,8 +205,7 @@ function showSummary(summary) {
     const app = document.getElementById("app");
 
     const finalScorePercent = (summary.final_score * 100).toFixed(1);
-    const scoreClass = summary.final_score >= 0.7 ? 'good' :
-        summary.final_score >= 0.5 ? 'okay' : 'poor';
+    const scoreClass = scoreClassFor(summary.final_score);
 
     app.innerHTML = `
         <div class="summary-container">